@@ -0,0 +1,27 @@
+# 부트스트랩 신뢰구간 벤치마크 (묶음 크기/프로세스 수별 시간, 결과 동일성 확인)
+# 실행: python -m benchmarks.bench_bootstrap
+
+import numpy as np
+
+from benchmarks.bench_risk_metrics import make_returns, timed
+from utils.bootstrap import bootstrap_intervals
+
+
+def run(n_tickers: int, n_days: int = 756, n_replicates: int = 500):
+    values = make_returns(n_tickers, n_days).to_numpy(dtype=float)
+    costs = np.full(n_tickers, 0.002)
+    baseline = bootstrap_intervals(values, 0.03 / 252, 0.03, costs, n_replicates=n_replicates)
+
+    for max_elements, n_jobs in ((250_000, 1), (1_000_000, 1), (4_000_000, 1), (1_000_000, 4)):
+        def call():
+            return bootstrap_intervals(values, 0.03 / 252, 0.03, costs, n_replicates=n_replicates,
+                                       max_elements=max_elements, n_jobs=n_jobs)
+        elapsed = timed(call, repeat=1)
+        same = np.array_equal(call(), baseline, equal_nan=True)
+        print(f"{n_tickers:>6} tickers x {n_days} days x {n_replicates} reps, chunk {max_elements:>9,}, "
+              f"jobs {n_jobs}: {elapsed:6.2f}s, identical {same}")
+
+
+if __name__ == '__main__':
+    for n in (150, 1_000):
+        run(n)
@@ -0,0 +1,57 @@
+# k 선택 벤치마크 (k마다 독립 KMeans + 최종 k 재학습 대비 엘보 탐색/분할 이어 학습 스윕의 학습 횟수, 반복 수, 시간, 선택한 k)
+# 실행: python -m benchmarks.bench_k_selection
+
+import time
+
+import numpy as np
+from kneed import KneeLocator
+from sklearn.cluster import KMeans
+from sklearn.metrics import adjusted_rand_score
+
+from benchmarks.bench_umap_search import make_features
+from utils.k_selection import K_CRITERIA, elbow_search, kmeans_sweep, score_sweep, select_k
+from utils.umap_search import evaluate_umap_config
+
+
+def independent_elbow(data: np.ndarray, k_values: list, random_state: int = 42):
+    """이전 방식: k마다 처음부터 학습하고 고른 k를 다시 학습"""
+    fits = [KMeans(n_clusters=k, n_init='auto', random_state=random_state).fit(data) for k in k_values]
+    kl = KneeLocator(k_values, [fit.inertia_ for fit in fits], curve='convex', direction='decreasing', S=1.0)
+    best_k = kl.elbow or 3
+    final = KMeans(n_clusters=best_k, n_init='auto', random_state=random_state).fit(data)
+    fits.append(final)
+    return best_k, final.labels_, len(fits), sum(fit.n_iter_ for fit in fits)
+
+
+def run(n_etfs: int, seed: int, k_values=range(2, 11)):
+    k_values = list(k_values)
+    _, embedding, _ = evaluate_umap_config(make_features(n_etfs, seed=seed), 15, 0.1, 42)
+
+    t0 = time.perf_counter()
+    old_k, old_labels, old_fits, old_iters = independent_elbow(embedding, k_values)
+    old_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    search_k, search_fits = elbow_search(embedding, k_values)
+    search_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    fits = kmeans_sweep(embedding, k_values)
+    sweep_time = time.perf_counter() - t0
+    scores = score_sweep(embedding, fits)
+    chosen = {criterion: select_k(scores, criterion) for criterion in K_CRITERIA}
+    score_time = time.perf_counter() - t0 - sweep_time
+    new_iters = sum(fit.n_iter_ for fit in fits.values())
+
+    print(f"{n_etfs:>6} ETFs seed {seed}: elbow search k {old_k} -> {search_k or 3}, KMeans fits {old_fits} -> {len(search_fits)}, "
+          f"time {old_time * 1000:6.1f}ms -> {search_time * 1000:6.1f}ms | "
+          f"sweep: KMeans fits {old_fits} -> {len(fits)} (from scratch {old_fits} -> 1), Lloyd iterations {old_iters} -> {new_iters}, "
+          f"k-means time {old_time * 1000:6.1f}ms -> {sweep_time * 1000:6.1f}ms (+{score_time * 1000:.1f}ms scoring), "
+          f"elbow k {old_k} -> {chosen['elbow']} (ARI {adjusted_rand_score(old_labels, fits[chosen['elbow']].labels_):.3f}), "
+          f"silhouette k {chosen['silhouette']}, CH k {chosen['calinski_harabasz']}")
+
+
+if __name__ == '__main__':
+    for n in (150, 1_000):
+        for seed in range(3):
+            run(n, seed)
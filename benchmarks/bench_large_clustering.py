@@ -0,0 +1,37 @@
+# 대규모 유니버스 클러스터링 벤치마크 (5,000개 ETF에서 optimize_clustering 전체 시간이 예산 안인지 확인)
+# 실행: python -m benchmarks.bench_large_clustering
+
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_umap_search import make_features
+from utils.clustering_cache import ClusteringCache
+from utils.real_etf_recommender import RealETFRecommender
+
+TIME_BUDGET_SECONDS = 90
+
+
+def run(n_etfs: int, n_workers: int = 1):
+    data = pd.DataFrame(make_features(n_etfs), index=[f"ETF{i:05d}" for i in range(n_etfs)])
+    recommender = RealETFRecommender()
+    recommender.clustering_workers = n_workers
+    with tempfile.TemporaryDirectory() as cache_dir:
+        recommender.clustering_cache = ClusteringCache(cache_dir)
+        # numba 컴파일 비용을 빼기 위해 작은 대규모 모드 입력으로 한 번 먼저 실행
+        recommender.large_universe_threshold = 500
+        recommender.optimize_clustering(data.iloc[:500])
+
+        t0 = time.perf_counter()
+        _, labels, info = recommender.optimize_clustering(data, return_details=True)
+        elapsed = time.perf_counter() - t0
+
+    status = 'OK' if elapsed <= TIME_BUDGET_SECONDS else 'OVER BUDGET'
+    print(f"{n_etfs:>6} ETFs: {elapsed:6.2f}s / budget {TIME_BUDGET_SECONDS}s [{status}], "
+          f"large mode {info['large_universe']}, k={info['best_k']} ({len(set(labels))} clusters), "
+          f"umap params {info['umap_params']}, sampled silhouette {info['silhouette']:.3f}")
+
+
+if __name__ == '__main__':
+    run(5_000)
@@ -0,0 +1,133 @@
+# 위험 지표 엔진 벤치마크 (기존 pandas 구현 대비 속도/수치 비교)
+# 실행: python -m benchmarks.bench_risk_metrics
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.data_fetcher import get_market
+from utils.risk_metrics import METRIC_COLUMNS, TAIL_LEVELS, compute_risk_metrics, tail_risk_metrics
+
+
+def legacy_risk_metrics(returns: pd.DataFrame, risk_free_rate=0.0) -> pd.DataFrame:
+    """열마다 pandas 연산을 따로 수행하던 기존 구현 (비교 기준)"""
+    metrics = pd.DataFrame(index=returns.columns)
+    annual_factor = 252
+
+    if isinstance(risk_free_rate, pd.Series):
+        rf_annual = risk_free_rate.reindex(returns.index).ffill().bfill().fillna(0.0)
+        daily_risk_free_rate = rf_annual / annual_factor
+        risk_free_rate = float(rf_annual.mean()) if len(rf_annual) else 0.0
+    else:
+        daily_risk_free_rate = risk_free_rate / annual_factor
+    transaction_cost = {'KR': 0.0015, 'US': 0.0030}
+
+    annual_return = returns.mean() * annual_factor
+    costs = annual_return.index.map(lambda tk: transaction_cost[get_market(tk)])
+    metrics['Annual Return'] = annual_return - costs
+    metrics['Annual Volatility'] = returns.std() * np.sqrt(annual_factor)
+    metrics['Sharpe Ratio'] = np.where(metrics['Annual Volatility'] > 1e-6,
+                                       (metrics['Annual Return'] - risk_free_rate) / metrics['Annual Volatility'], 0)
+
+    cumulative_returns = (1 + returns).cumprod()
+    peak = cumulative_returns.cummax()
+    drawdown = (cumulative_returns - peak) / peak
+    metrics['Max Drawdown'] = drawdown.min()
+    metrics['Ulcer Index'] = np.sqrt((drawdown**2).mean())
+
+    downside_returns = returns[returns.lt(daily_risk_free_rate, axis=0)].fillna(0)
+    metrics['Downside Risk'] = downside_returns.std() * np.sqrt(annual_factor)
+    metrics['Sortino Ratio'] = np.where(metrics['Downside Risk'] > 1e-6,
+                                        (metrics['Annual Return'] - risk_free_rate) / metrics['Downside Risk'], 0)
+
+    gain = returns.sub(daily_risk_free_rate, axis=0).clip(lower=0).mean()
+    loss = (-returns).add(daily_risk_free_rate, axis=0).clip(lower=0).mean()
+    metrics['Omega Ratio'] = np.where(loss > 1e-9, gain / loss, 0)
+
+    metrics['Calmar Ratio'] = np.where(np.abs(metrics['Max Drawdown']) > 1e-6,
+                                       metrics['Annual Return'] / (-metrics['Max Drawdown']), 0)
+
+    metrics['Skewness'] = returns.skew()
+    metrics['Kurtosis'] = returns.kurt()
+
+    if len(returns) >= annual_factor:
+        metrics['Recent Return'] = returns.iloc[-annual_factor:].mean() * annual_factor
+        metrics['Recent Volatility'] = returns.iloc[-annual_factor:].std() * np.sqrt(annual_factor)
+    else:
+        metrics[['Recent Return', 'Recent Volatility']] = np.nan
+
+    return metrics.fillna(0).replace([np.inf, -np.inf], 0)
+
+
+def fused_risk_metrics(returns: pd.DataFrame, risk_free_rate=0.0) -> pd.DataFrame:
+    """RealETFRecommender.calculate_risk_metrics와 같은 방식으로 엔진 호출"""
+    if isinstance(risk_free_rate, pd.Series):
+        rf_annual = risk_free_rate.reindex(returns.index).ffill().bfill().fillna(0.0)
+        daily = rf_annual.to_numpy(dtype=float) / 252
+        risk_free_rate = float(rf_annual.mean()) if len(rf_annual) else 0.0
+    else:
+        daily = risk_free_rate / 252
+    costs = np.array([0.0015 if get_market(tk) == 'KR' else 0.0030 for tk in returns.columns])
+    values = compute_risk_metrics(returns.to_numpy(dtype=float), daily, risk_free_rate, costs)
+    return pd.DataFrame(values, index=returns.columns, columns=METRIC_COLUMNS)
+
+
+def make_returns(n_tickers: int, n_days: int = 756, missing_rate: float = 0.01, seed: int = 0) -> pd.DataFrame:
+    """상장 전 구간과 중간 결측이 섞인 가상 수익률"""
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0.0003, 0.012, (n_days, n_tickers))
+    values[rng.random(values.shape) < missing_rate] = np.nan
+    listing = rng.integers(0, n_days // 3, n_tickers)
+    values[np.arange(n_days)[:, None] < listing[None, :] * (rng.random(n_tickers) < 0.2)] = np.nan
+    columns = [f"{i:06d}" if i % 3 == 0 else f"US{i}" for i in range(n_tickers)]
+    return pd.DataFrame(values, index=pd.bdate_range('2022-01-03', periods=n_days), columns=columns)
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = np.inf
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(n_tickers: int):
+    returns = make_returns(n_tickers)
+    rf_series = pd.Series(np.linspace(0.03, 0.045, len(returns)), index=returns.index)
+
+    max_diff = 0.0
+    for rate in (0.035, rf_series):
+        expected = legacy_risk_metrics(returns, rate)
+        actual = fused_risk_metrics(returns, rate)
+        max_diff = max(max_diff, float(np.abs(actual.to_numpy() - expected[METRIC_COLUMNS].to_numpy()).max()))
+
+    legacy = timed(legacy_risk_metrics, returns, rf_series)
+    fused = timed(fused_risk_metrics, returns, rf_series)
+    print(f"{n_tickers:>6} tickers: legacy {legacy * 1000:8.1f}ms, fused {fused * 1000:8.1f}ms, "
+          f"x{legacy / fused:5.1f}, max diff {max_diff:.1e}")
+
+
+def sorted_tail_var(values: np.ndarray) -> np.ndarray:
+    """비교용: 전체 정렬(np.nanquantile)로 구한 역사적 VaR"""
+    return np.nanquantile(values, [1 - level for level in TAIL_LEVELS], axis=0)
+
+
+def run_tail(n_tickers: int, n_days: int = 2_520):
+    """꼬리 위험(VaR/CVaR) 계산이 기존 지표 계산 시간 안에 들어오는지 확인"""
+    returns = make_returns(n_tickers, n_days)
+    values = returns.to_numpy(dtype=float)
+    metrics = timed(fused_risk_metrics, returns, 0.035)
+    tail = timed(tail_risk_metrics, values)
+    full_sort = timed(sorted_tail_var, values)
+    max_diff = float(np.nanmax(np.abs(tail_risk_metrics(values)[:, ::3] - sorted_tail_var(values).T)))
+    print(f"{n_tickers:>6} tickers x {n_days} days: metrics {metrics * 1000:8.1f}ms, "
+          f"tail(partition) {tail * 1000:8.1f}ms, VaR(full sort) {full_sort * 1000:8.1f}ms, max diff {max_diff:.1e}")
+
+
+if __name__ == '__main__':
+    for n in (125, 1_000, 10_000):
+        run(n)
+    for n in (1_000, 5_000):
+        run_tail(n)
@@ -0,0 +1,44 @@
+# UMAP 격자 탐색 벤치마크 (직렬 대비 프로세스 풀 시간, 최적 임베딩 동일성 확인)
+# 실행: python -m benchmarks.bench_umap_search
+
+import os
+import time
+
+import numpy as np
+from sklearn.preprocessing import RobustScaler
+
+from utils.umap_search import search_umap_grid, umap_grid
+
+
+def make_features(n_etfs: int, n_features: int = 12, seed: int = 0) -> np.ndarray:
+    """군집 3개가 섞인 가상 위험 지표"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 3, (3, n_features))
+    data = centers[rng.integers(0, 3, n_etfs)] + rng.normal(0, 1, (n_etfs, n_features))
+    return RobustScaler().fit_transform(data)
+
+
+def run(n_etfs: int, n_workers: int):
+    data = make_features(n_etfs)
+    grid = umap_grid(len(data))
+    # numba 컴파일 비용을 빼기 위해 양쪽 모두 한 번씩 먼저 실행
+    search_umap_grid(data, grid[:1], n_workers=1)
+    search_umap_grid(data, grid[:n_workers], n_workers=n_workers)
+
+    t0 = time.perf_counter()
+    serial, serial_score, _, _, _ = search_umap_grid(data, grid, n_workers=1)
+    serial_time = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    parallel, parallel_score, _, _, _ = search_umap_grid(data, grid, n_workers=n_workers)
+    parallel_time = time.perf_counter() - t0
+
+    print(f"{n_etfs:>6} ETFs: serial {serial_time:6.2f}s, {n_workers} workers {parallel_time:6.2f}s, "
+          f"x{serial_time / parallel_time:4.1f}, identical {np.array_equal(serial, parallel)} "
+          f"(silhouette {serial_score:.3f} / {parallel_score:.3f})")
+
+
+if __name__ == '__main__':
+    workers = max(2, min(9, os.cpu_count() or 1))
+    for n in (150, 1_000):
+        run(n, workers)
@@ -108,6 +108,81 @@ basic_metrics = [
 
 display_large_metric_row(basic_metrics)
 
+# 기간별 성과 (저장된 가격 이력 기준 실제 누적 수익률/CAGR)
+def format_period_return(value):
+    return "데이터 부족" if pd.isna(value) else f"{value:.1f}%"
+
+period_metrics = [
+    {
+        "label": "3년 누적 수익률",
+        "value": format_period_return(selected_etf.get('Return_3Y', np.nan)),
+        "help": "최근 3년간 실제 가격 기준 누적 수익률입니다. 상장 기간이 짧으면 표시되지 않습니다."
+    },
+    {
+        "label": "3년 연평균 수익률",
+        "value": format_period_return(selected_etf.get('CAGR_3Y', np.nan)),
+        "help": "최근 3년 누적 수익률을 연 복리 기준으로 환산한 값(CAGR)입니다."
+    },
+    {
+        "label": "5년 누적 수익률",
+        "value": format_period_return(selected_etf.get('Return_5Y', np.nan)),
+        "help": "최근 5년간 실제 가격 기준 누적 수익률입니다. 상장 기간이 짧으면 표시되지 않습니다."
+    },
+    {
+        "label": "5년 연평균 수익률",
+        "value": format_period_return(selected_etf.get('CAGR_5Y', np.nan)),
+        "help": "최근 5년 누적 수익률을 연 복리 기준으로 환산한 값(CAGR)입니다."
+    }
+]
+
+st.markdown("#### 기간별 성과")
+display_large_metric_row(period_metrics)
+
+# 기간 지정 분석 (누적합 인덱스/낙폭 트리 조회라 기간을 바꿔도 전체 재계산 없음)
+return_index = getattr(recommender, 'return_index', None)
+if return_index is not None and selected_ticker in return_index.positions and len(return_index.dates) > 1:
+    st.markdown("#### 기간 지정 분석")
+    first_day, last_day = return_index.dates[0].date(), return_index.dates[-1].date()
+    default_start = max(first_day, (return_index.dates[-1] - pd.DateOffset(years=1)).date())
+    range_start, range_end = st.slider(
+        "분석 기간",
+        min_value=first_day,
+        max_value=last_day,
+        value=(default_start, last_day),
+        format="YYYY-MM-DD"
+    )
+    window_stats = return_index.window(range_start, range_end, tickers=[selected_ticker]).iloc[0]
+    window_drawdown = return_index.max_drawdown(range_start, range_end, tickers=[selected_ticker]).iloc[0]
+
+    if pd.isna(window_drawdown['Max Drawdown']):
+        drawdown_period = "-"
+    else:
+        drawdown_period = f"{window_drawdown['Peak Date']:%Y-%m-%d} → {window_drawdown['Trough Date']:%Y-%m-%d}"
+
+    range_metrics = [
+        {
+            "label": "구간 수익률",
+            "value": format_period_return(window_stats['Return'] * 100),
+            "help": "선택한 기간 시작일 종가 대비 종료일 종가의 누적 수익률입니다."
+        },
+        {
+            "label": "구간 변동성",
+            "value": format_period_return(window_stats['Annual Volatility'] * 100),
+            "help": "선택한 기간의 일별 로그수익률 표준편차를 연율화한 값입니다."
+        },
+        {
+            "label": "구간 최대 낙폭",
+            "value": format_period_return(window_drawdown['Max Drawdown'] * 100),
+            "help": "선택한 기간 안에서 고점 대비 가장 크게 하락한 비율입니다."
+        },
+        {
+            "label": "낙폭 구간",
+            "value": drawdown_period,
+            "help": "최대 낙폭이 발생한 고점 날짜와 저점 날짜입니다."
+        }
+    ]
+    display_large_metric_row(range_metrics)
+
 # 고급 지표
 advanced_metrics = [
     {
@@ -170,6 +245,22 @@ st.plotly_chart(fig_matrix, use_container_width=True)
 # 성과 지표 비교
 st.subheader("성과 지표 상세 비교")
 
+# 부트스트랩 신뢰구간 (데이터 갱신 때 미리 계산된 값, 없으면 오차 막대 생략)
+metric_intervals = getattr(recommender, 'metric_intervals', None)
+
+
+def interval_error(tickers, metric, values, scale=1.0, absolute=False):
+    """표시 값 기준 비대칭 오차 막대 (go.Bar error_y)"""
+    if metric_intervals is None:
+        return None
+    bounds = metric_intervals.reindex(tickers)[[f"{metric} Low", f"{metric} High"]].to_numpy() * scale
+    if absolute:
+        bounds = np.abs(bounds)[:, ::-1]
+    values = np.asarray(values, dtype=float)
+    return dict(type='data', symmetric=False, array=np.clip(bounds[:, 1] - values, 0, None),
+                arrayminus=np.clip(values - bounds[:, 0], 0, None), visible=True)
+
+
 col1, col2 = st.columns(2)
 
 with col1:
@@ -178,8 +269,17 @@ with col1:
     risk_values = [selected_etf[metric] for metric in risk_metrics]
     risk_labels = ['샤프 비율', '소르티노 비율', '칼마 비율', '오메가 비율']
     
+    # 샤프/소르티노만 신뢰구간이 있으므로 나머지는 오차 0
+    risk_error = None
+    if metric_intervals is not None and selected_ticker in metric_intervals.index:
+        sharpe_error = interval_error([selected_ticker], 'Sharpe Ratio', [risk_values[0]])
+        sortino_error = interval_error([selected_ticker], 'Sortino Ratio', [risk_values[1]])
+        risk_error = dict(type='data', symmetric=False, visible=True,
+                          array=[sharpe_error['array'][0], sortino_error['array'][0], 0, 0],
+                          arrayminus=[sharpe_error['arrayminus'][0], sortino_error['arrayminus'][0], 0, 0])
+    
     fig_risk = go.Figure(data=[
-        go.Bar(x=risk_labels, y=risk_values, 
+        go.Bar(x=risk_labels, y=risk_values, error_y=risk_error,
                marker_color=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728'])
     ])
     fig_risk.update_layout(
@@ -206,6 +306,35 @@ with col2:
     )
     st.plotly_chart(fig_perf, use_container_width=True)
 
+# 롤링 위험 지표 (스냅샷 공유 계산기, 같은 ETF/기간은 캐시에서 바로 조회)
+rolling_metrics = getattr(recommender, 'rolling_metrics', None)
+if rolling_metrics is not None and selected_ticker in rolling_metrics.returns.columns:
+    st.subheader("롤링 위험 지표")
+
+    window_options = {"3개월": 63, "6개월": 126, "1년": 252}
+    window_label = st.radio("롤링 기간", list(window_options), index=1, horizontal=True)
+    benchmark = '069500' if selected_etf['Market'] == 'KR' else 'SPY'
+    rolling = rolling_metrics.get([selected_ticker], window_options[window_label],
+                                  benchmark=benchmark if benchmark != selected_ticker else None)
+
+    fig_rolling = make_subplots(
+        rows=4, cols=1, shared_xaxes=True, vertical_spacing=0.05,
+        subplot_titles=['롤링 변동성 (%)', '롤링 샤프 비율', f'{window_label} 고점 대비 낙폭 (%)',
+                        f'{benchmark} 대비 베타 / 상관계수']
+    )
+    fig_rolling.add_trace(go.Scatter(x=rolling['Volatility'].index, y=rolling['Volatility'][selected_ticker] * 100,
+                                     name='변동성', line=dict(color='#ff7f0e')), row=1, col=1)
+    fig_rolling.add_trace(go.Scatter(x=rolling['Sharpe'].index, y=rolling['Sharpe'][selected_ticker],
+                                     name='샤프 비율', line=dict(color='#1f77b4')), row=2, col=1)
+    fig_rolling.add_trace(go.Scatter(x=rolling['Drawdown'].index, y=rolling['Drawdown'][selected_ticker] * 100,
+                                     name='낙폭', fill='tozeroy', line=dict(color='#d62728')), row=3, col=1)
+    fig_rolling.add_trace(go.Scatter(x=rolling['Beta'].index, y=rolling['Beta'][selected_ticker],
+                                     name='베타', line=dict(color='#2ca02c')), row=4, col=1)
+    fig_rolling.add_trace(go.Scatter(x=rolling['Correlation'].index, y=rolling['Correlation'][selected_ticker],
+                                     name='상관계수', line=dict(color='#9467bd')), row=4, col=1)
+    fig_rolling.update_layout(height=900, title_text=f"{selected_etf['Name']} 롤링 위험 지표 ({window_label})")
+    st.plotly_chart(fig_rolling, use_container_width=True)
+
 # 추천 ETF 전체 비교
 st.subheader("추천 ETF 전체 성과 비교")
 
@@ -229,11 +358,16 @@ for i, (metric, name) in enumerate(zip(metrics_to_compare, metric_names)):
     values = recommendations[metric].tolist()
     if metric == 'Max_Drawdown':
         values = [abs(v) for v in values]
+    interval_metric = {'Return_1Y': ('Annual Return', 100), 'Sharpe_Ratio': ('Sharpe Ratio', 1),
+                       'Max_Drawdown': ('Max Drawdown', 100)}.get(metric)
+    error_y = interval_error(recommendations['Ticker'], interval_metric[0], values, scale=interval_metric[1],
+                             absolute=metric == 'Max_Drawdown') if interval_metric else None
     
     fig_compare.add_trace(
         go.Bar(
             x=recommendations['Name'],
             y=values,
+            error_y=error_y,
             name=name,
             marker_color=colors[i % len(colors)],
             showlegend=False
@@ -244,6 +378,8 @@ for i, (metric, name) in enumerate(zip(metrics_to_compare, metric_names)):
 fig_compare.update_layout(height=800, title_text="추천 ETF 주요 지표 비교")
 fig_compare.update_xaxes(tickangle=45)
 st.plotly_chart(fig_compare, use_container_width=True)
+if metric_intervals is not None:
+    st.caption("오차 막대는 블록 부트스트랩 90% 신뢰구간입니다. 데이터 기간이 짧을수록 구간이 넓어집니다.")
 
 # 상관관계 분석
 if hasattr(recommender, 'returns_df') and recommender.returns_df is not None:
@@ -253,7 +389,11 @@ if hasattr(recommender, 'returns_df') and recommender.returns_df is not None:
     available_tickers = [t for t in recommended_tickers if t in recommender.returns_df.columns]
     
     if len(available_tickers) >= 2:
-        correlation_matrix = recommender.returns_df[available_tickers].corr()
+        # 미리 계산된 유니버스 상관 행렬에서 잘라 씀 (없으면 직접 계산)
+        if getattr(recommender, 'correlation', None) is not None:
+            correlation_matrix = recommender.correlation.sub(available_tickers)
+        else:
+            correlation_matrix = recommender.returns_df[available_tickers].corr()
         
         fig_corr = px.imshow(
             correlation_matrix,
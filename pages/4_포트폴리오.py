@@ -149,9 +149,15 @@ if selected_core:
                 st.stop()
 
             complement_candidates = all_etfs[all_etfs['Ticker'] != core_ticker].copy()
-            complement_candidates['Correlation'] = complement_candidates['Ticker'].apply(
-                lambda tk: returns_df[core_ticker].corr(returns_df[tk]) if tk in returns_df.columns else np.nan
-            )
+            if getattr(recommender, 'correlation', None) is not None:
+                # 유니버스 상관 행렬의 핵심 ETF 행 하나로 모든 후보를 한 번에 조회
+                complement_candidates['Correlation'] = complement_candidates['Ticker'].map(
+                    recommender.correlation.against(core_ticker)
+                )
+            else:
+                complement_candidates['Correlation'] = complement_candidates['Ticker'].apply(
+                    lambda tk: returns_df[core_ticker].corr(returns_df[tk]) if tk in returns_df.columns else np.nan
+                )
             complement_candidates.dropna(subset=['Correlation'], inplace=True)
             complement_candidates['CorrelationAbs'] = complement_candidates['Correlation'].abs()
             complement_candidates['Score'] = complement_candidates['Sharpe_Ratio'] - complement_candidates['CorrelationAbs']
@@ -0,0 +1,57 @@
+# optimize_clustering 진단값 형식 (선택한 k의 값은 스칼라, k별 곡선은 별도 키의 리스트)
+# 실행: python -m pytest tests
+
+import numbers
+
+import pandas as pd
+import pytest
+
+from benchmarks.bench_umap_search import make_features
+from utils.clustering_cache import ClusteringCache
+from utils.real_etf_recommender import RealETFRecommender
+
+
+@pytest.fixture
+def recommender(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 캐시 디렉터리를 임시 경로에 만듦
+    recommender = RealETFRecommender()
+    recommender.clustering_workers = 1
+    recommender.clustering_cache = ClusteringCache(tmp_path / "clustering")
+    return recommender
+
+
+def check_diagnostics(details):
+    assert isinstance(details['best_k'], int)
+    assert isinstance(details['silhouette'], numbers.Real)
+    assert isinstance(details['umap_silhouette'], numbers.Real)
+    assert isinstance(details['large_universe'], bool)
+    n_values = len(details['k_values'])
+    assert n_values > 0 and details['best_k'] in details['k_values']
+    for key in ('wcss', 'k_silhouette', 'k_calinski_harabasz'):
+        assert isinstance(details[key], list) and len(details[key]) == n_values
+        assert all(isinstance(value, numbers.Real) for value in details[key])
+    assert details['silhouette'] == details['k_silhouette'][details['k_values'].index(details['best_k'])]
+
+
+def test_diagnostics_types_on_fit_and_cache_hit(recommender):
+    data = pd.DataFrame(make_features(80, n_features=6))
+
+    embedding, labels, details = recommender.optimize_clustering(data, k_range=range(2, 8), return_details=True)
+    assert not details['cache_hit']
+    check_diagnostics(details)
+    assert len(set(labels)) == details['best_k']
+
+    cached_embedding, cached_labels, cached = recommender.optimize_clustering(data, k_range=range(2, 8),
+                                                                              return_details=True)
+    assert cached['cache_hit']
+    check_diagnostics(cached)
+    assert (cached_labels == labels).all() and (cached_embedding == embedding).all()
+
+
+def test_large_universe_diagnostics(recommender):
+    recommender.large_universe_threshold = 60
+    data = pd.DataFrame(make_features(80, n_features=6))
+
+    _, _, details = recommender.optimize_clustering(data, k_range=range(2, 8), return_details=True)
+    assert details['large_universe']
+    check_diagnostics(details)
@@ -0,0 +1,94 @@
+# 엘보 k 탐색(elbow_search)이 k별 독립 학습 + kneed와 같은 k를 고르면서 학습 횟수를 줄이는지 확인
+# 실행: python -m pytest tests
+
+import numpy as np
+import pytest
+from kneed import KneeLocator
+from sklearn.cluster import KMeans
+
+import utils.k_selection as k_selection
+from benchmarks.bench_umap_search import make_features
+from utils.k_selection import elbow_search
+
+K_VALUES = list(range(2, 11))
+BASELINE_FITS = len(K_VALUES) + 1  # 이전 방식: k마다 학습 + 고른 k 재학습
+
+
+def kneed_elbow(k_values, wcss):
+    return KneeLocator(k_values, wcss, curve='convex', direction='decreasing', S=1.0).elbow
+
+
+@pytest.fixture
+def fit_counter(monkeypatch):
+    """k_selection이 쓰는 KMeans의 fit 호출 수"""
+    calls = []
+
+    class CountingKMeans(KMeans):
+        def fit(self, X, y=None, sample_weight=None):
+            calls.append(self.n_clusters)
+            return super().fit(X, y, sample_weight)
+
+    monkeypatch.setattr(k_selection, 'KMeans', CountingKMeans)
+    return calls
+
+
+def table_estimator(wcss: dict):
+    """학습 없이 k별 WCSS 표를 돌려주는 추정기 (학습한 k를 fitted에 기록)"""
+    fitted = []
+
+    class TableKMeans:
+        def __init__(self, n_clusters, **options):
+            self.n_clusters = n_clusters
+
+        def fit(self, data):
+            fitted.append(self.n_clusters)
+            self.inertia_ = wcss[self.n_clusters]
+            return self
+
+    return TableKMeans, fitted
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_same_k_as_independent_fits_with_fewer_fits(fit_counter, seed):
+    data = make_features(300, n_features=3, seed=seed)
+    independent = [KMeans(n_clusters=k, n_init='auto', random_state=42).fit(data) for k in K_VALUES]
+    fit_counter.clear()
+
+    best_k, fits = elbow_search(data, K_VALUES)
+    assert best_k == kneed_elbow(K_VALUES, [fit.inertia_ for fit in independent])
+    assert len(fit_counter) == len(fits) <= 6 < BASELINE_FITS
+    # 학습한 k는 독립 학습과 같은 해 (고른 k의 라벨을 재학습 없이 그대로 사용)
+    for fit in independent:
+        if fit.n_clusters in fits:
+            np.testing.assert_array_equal(fits[fit.n_clusters].labels_, fit.labels_)
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_matches_kneed_on_convex_curves(monkeypatch, seed):
+    rng = np.random.default_rng(seed)
+    drops = np.sort(rng.gamma(rng.uniform(0.3, 3.0), size=len(K_VALUES) - 1))[::-1]
+    wcss = dict(zip(K_VALUES, np.concatenate([[0.0], -np.cumsum(drops)]) + drops.sum() + 1.0))
+    estimator, fitted = table_estimator(wcss)
+    monkeypatch.setattr(k_selection, 'KMeans', estimator)
+
+    best_k, _ = elbow_search(np.zeros((20, 2)), K_VALUES)
+    assert best_k == kneed_elbow(K_VALUES, [wcss[k] for k in K_VALUES])
+    assert len(fitted) == len(set(fitted)) <= 6
+
+
+@pytest.mark.parametrize('knee', K_VALUES[1:-1])
+def test_fit_count_for_every_knee_position(monkeypatch, knee):
+    wcss = {k: 10.0 * max(knee - k, 0) + (K_VALUES[-1] - k) for k in K_VALUES}
+    estimator, fitted = table_estimator(wcss)
+    monkeypatch.setattr(k_selection, 'KMeans', estimator)
+
+    best_k, _ = elbow_search(np.zeros((20, 2)), K_VALUES)
+    assert best_k == kneed_elbow(K_VALUES, [wcss[k] for k in K_VALUES])
+    assert best_k == (knee if knee < K_VALUES[-2] else None)  # k_max 바로 앞의 무릎은 kneed 임계값에 못 미침
+    assert len(fitted) <= 6
+
+
+def test_no_knee_on_straight_line(monkeypatch):
+    estimator, _ = table_estimator({k: 100.0 - k for k in K_VALUES})
+    monkeypatch.setattr(k_selection, 'KMeans', estimator)
+    assert elbow_search(np.zeros((20, 2)), K_VALUES)[0] is None
@@ -0,0 +1,91 @@
+# 지표 누적 상태(MetricAccumulator)의 증분 갱신이 전체 재계산과 같은지, 과거 가격이 바뀌면 다시 만드는지 확인
+# 실행: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_risk_metrics import make_returns
+from utils.data_fetcher import get_market
+from utils.price_store import PriceStore
+from utils.real_etf_recommender import RealETFRecommender
+from utils.risk_metrics import MetricAccumulator, compute_risk_metrics
+
+
+@pytest.fixture
+def returns():
+    returns = make_returns(40, n_days=600, missing_rate=0.03)
+    returns.iloc[:, 1] = np.nan
+    returns.iloc[-5:, 2] = np.nan
+    return returns
+
+
+@pytest.fixture
+def recommender(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # 캐시 디렉터리를 임시 경로에 만듦
+    recommender = RealETFRecommender()
+    recommender.price_store = PriceStore(tmp_path / "price_store")
+    return recommender
+
+
+def costs_of(tickers) -> np.ndarray:
+    return np.array([0.0015 if get_market(tk) == 'KR' else 0.0030 for tk in tickers])
+
+
+def test_extend_matches_full_recompute(returns, tmp_path):
+    rf_annual = np.linspace(0.03, 0.04, len(returns))
+    daily = rf_annual / 252
+    costs = costs_of(returns.columns)
+    store = PriceStore(tmp_path / "price_store")
+
+    accumulator = MetricAccumulator.from_returns(returns.iloc[:100], daily[:100], rf_annual[:100])
+    for end in (101, 251, 252, 253, 400, 600):  # 최근 1년 순환 버퍼가 차고 넘치는 경계 포함
+        arrays, meta = accumulator.to_arrays()
+        store.save_arrays('state', arrays, **meta)
+        accumulator = MetricAccumulator.from_arrays(*store.load_arrays('state'))
+
+        window = returns.iloc[:end]
+        assert accumulator.can_extend(window, rf_annual[:end])
+        accumulator.extend(window, daily[:end], rf_annual[:end])
+        assert accumulator.rows == end
+
+        expected = compute_risk_metrics(window.to_numpy(), daily[:end], rf_annual[:end].mean(), costs)
+        np.testing.assert_allclose(accumulator.metrics(costs), expected, rtol=0, atol=1e-10)
+
+
+def test_can_extend_rejects_changed_history(returns):
+    rf_annual = np.full(len(returns), 0.035)
+    accumulator = MetricAccumulator.from_returns(returns.iloc[:400], rf_annual[:400] / 252, rf_annual[:400])
+    assert accumulator.can_extend(returns, rf_annual)
+
+    restated = returns.copy()
+    restated.iloc[50, 3] += 0.01  # 수정 가격 재다운로드
+    assert not accumulator.can_extend(restated, rf_annual)
+
+    backfilled = returns.copy()
+    backfilled.iloc[200, 1] = 0.01  # 뒤늦게 채워진 과거 가격
+    assert not accumulator.can_extend(backfilled, rf_annual)
+
+    assert not accumulator.can_extend(returns, rf_annual * 1.01)
+    assert not accumulator.can_extend(returns.iloc[1:], rf_annual[1:])
+    assert not accumulator.can_extend(returns.drop(columns=returns.columns[0]), rf_annual)
+
+
+def test_update_risk_metrics_rebuilds_restated_ticker(recommender, returns):
+    rf_series = pd.Series(0.035, index=returns.index)
+
+    recommender.update_risk_metrics('metric_state', returns.iloc[:400], rf_series.iloc[:400])
+    assert recommender.last_metric_update['mode'] == 'full'
+
+    recommender.update_risk_metrics('metric_state', returns.iloc[:450], rf_series.iloc[:450])
+    assert recommender.last_metric_update == {'mode': 'incremental', 'new_rows': 50}
+
+    restated = returns.copy()
+    restated.iloc[10, 3] *= 0.5
+    metrics = recommender.update_risk_metrics('metric_state', restated, rf_series)
+    assert recommender.last_metric_update['mode'] == 'full'
+    pd.testing.assert_frame_equal(metrics, recommender.calculate_risk_metrics(restated, rf_series),
+                                  check_exact=False, rtol=0, atol=1e-10)
+
+    recommender.update_risk_metrics('metric_state', restated, rf_series)
+    assert recommender.last_metric_update == {'mode': 'incremental', 'new_rows': 0}
@@ -0,0 +1,48 @@
+# 위험 지표 엔진(compute_risk_metrics)과 기존 열별 pandas 구현의 수치 비교
+# 실행: python -m pytest tests
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_risk_metrics import legacy_risk_metrics, make_returns
+from utils.data_fetcher import get_market
+from utils.risk_metrics import METRIC_COLUMNS, compute_risk_metrics
+
+
+def engine_metrics(returns: pd.DataFrame, rf_annual: np.ndarray) -> np.ndarray:
+    costs = np.array([0.0015 if get_market(tk) == 'KR' else 0.0030 for tk in returns.columns])
+    return compute_risk_metrics(returns.to_numpy(dtype=float), rf_annual / 252, float(rf_annual.mean()), costs)
+
+
+def legacy_metrics(returns: pd.DataFrame, rf_annual: np.ndarray) -> np.ndarray:
+    return legacy_risk_metrics(returns, pd.Series(rf_annual, index=returns.index))[METRIC_COLUMNS].to_numpy()
+
+
+def with_gaps(n_days: int) -> pd.DataFrame:
+    returns = make_returns(30, n_days=max(n_days, 60), missing_rate=0.05, seed=n_days).iloc[-n_days:].copy()
+    returns.iloc[:, 1] = np.nan                      # 전부 결측
+    returns.iloc[-5:, 2] = np.nan                    # 끝부분 결측 (상장폐지)
+    returns.iloc[:-3, 4] = np.nan                    # 최근 3일만 있음
+    returns.iloc[:, 5] = np.where(np.arange(n_days) % 2, np.nan, 0.0)  # 값이 전부 0
+    return returns
+
+
+@pytest.mark.parametrize('n_days', [1, 2, 5, 60, 251, 252, 600])
+def test_matches_legacy(n_days):
+    returns = with_gaps(n_days)
+    rf_annual = np.linspace(0.03, 0.045, n_days)
+
+    expected = legacy_metrics(returns, rf_annual)
+    actual = engine_metrics(returns, rf_annual)
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual, expected, rtol=0, atol=1e-10)
+
+
+def test_matches_legacy_with_small_chunks():
+    returns = with_gaps(300)
+    rf_annual = np.full(300, 0.035)
+    costs = np.array([0.0015 if get_market(tk) == 'KR' else 0.0030 for tk in returns.columns])
+
+    actual = compute_risk_metrics(returns.to_numpy(), rf_annual / 252, 0.035, costs, chunk_size=7)
+    np.testing.assert_allclose(actual, legacy_metrics(returns, rf_annual), rtol=0, atol=1e-10)
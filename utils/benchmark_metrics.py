@@ -0,0 +1,63 @@
+# 벤치마크 대비 지표 (베타, 젠센 알파, 추적오차, 정보비율, 상승/하락 포착률)
+# 모든 티커 x 모든 벤치마크를 결측 마스크 행렬곱으로 한 번에 회귀
+
+import numpy as np
+
+BENCHMARK_COLUMNS = ['Beta', 'Alpha', 'Tracking Error', 'Information Ratio', 'Up Capture', 'Down Capture']
+MARKET_BENCHMARKS = {'KR': '069500', 'US': 'SPY'}  # 시장별 기본 벤치마크 (KODEX 200, S&P 500)
+
+
+def benchmark_relative_metrics(values: np.ndarray, benchmarks: np.ndarray, daily_rf=0.0,
+                               annual_factor: int = 252, min_periods: int = 2) -> np.ndarray:
+    """(거래일 x 티커) 수익률과 (거래일 x 벤치마크) 수익률의 단일 팩터 회귀
+
+    각 (벤치마크, 티커) 쌍은 두 수익률이 모두 있는 거래일만 사용합니다.
+    베타/알파는 무위험 이자율을 뺀 초과수익률 기준, 포착률은 벤치마크 상승(하락)일의
+    평균 수익률 비율입니다.
+
+    Returns:
+        (벤치마크, 티커, BENCHMARK_COLUMNS) 배열 - 알파/추적오차/정보비율은 연율
+    """
+    daily_rf = np.broadcast_to(np.asarray(daily_rf, dtype=np.float64), (len(values),))[:, None]
+    valid_x, valid_b = ~np.isnan(values), ~np.isnan(benchmarks)
+    mx, mb = valid_x.astype(np.float64), valid_b.astype(np.float64)
+
+    # 열 평균을 빼고 합산해 자릿수 손실을 줄임
+    excess_x, excess_b = values - daily_rf, benchmarks - daily_rf
+    cx = np.nan_to_num(np.nanmean(excess_x, axis=0)) if valid_x.any() else np.zeros(values.shape[1])
+    cb = np.nan_to_num(np.nanmean(excess_b, axis=0)) if valid_b.any() else np.zeros(benchmarks.shape[1])
+    x = np.where(valid_x, excess_x - cx, 0.0)
+    b = np.where(valid_b, excess_b - cb, 0.0)
+
+    n = mb.T @ mx                # (벤치마크, 티커) 공통 거래일 수
+    sx, sb = mb.T @ x, b.T @ mx
+    sxx, sbb, sxb = mb.T @ (x * x), (b * b).T @ mx, b.T @ x
+
+    raw_x = np.where(valid_x, values, 0.0)
+    up = (valid_b & (benchmarks > 0)).astype(np.float64)
+    down = (valid_b & (benchmarks < 0)).astype(np.float64)
+    raw_b = np.where(valid_b, benchmarks, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxb - sx * sb / n
+        var_x = np.maximum(sxx - sx * sx / n, 0.0)
+        var_b = np.maximum(sbb - sb * sb / n, 0.0)
+        beta = np.where(var_b > 0, cov / var_b, np.nan)
+        mean_x = sx / n + cx
+        mean_b = sb / n + cb[:, None]
+        alpha = (mean_x - beta * mean_b) * annual_factor
+
+        # 거의 같은 수익률이면 뺄셈 오차만 남으므로 상대 오차 이하는 0으로 처리
+        active_var = var_x + var_b - 2 * cov
+        active_var = np.where(active_var > 1e-10 * (var_x + var_b), active_var, 0.0) / (n - 1)
+        tracking_error = np.sqrt(active_var * annual_factor)
+        information_ratio = np.where(tracking_error > 0,
+                                     (mean_x - mean_b) * annual_factor / tracking_error, np.nan)
+
+        # 포착률: 벤치마크 상승(하락)일 티커 수익률 합 / 같은 날 벤치마크 수익률 합
+        up_capture = (up.T @ raw_x) / ((up * raw_b).T @ mx)
+        down_capture = (down.T @ raw_x) / ((down * raw_b).T @ mx)
+
+    result = np.stack([beta, alpha, tracking_error, information_ratio, up_capture, down_capture], axis=-1)
+    result[n < max(min_periods, 2)] = np.nan
+    return result
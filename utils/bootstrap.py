@@ -0,0 +1,133 @@
+# 위험 지표 부트스트랩 신뢰구간
+# 정상(stationary) 블록 부트스트랩 재표본을 (반복, 거래일, 티커) 묶음으로 한 번에 계산
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+BOOTSTRAP_METRICS = ['Annual Return', 'Sharpe Ratio', 'Sortino Ratio', 'Max Drawdown']
+BOOTSTRAP_COLUMNS = [f"{metric} {bound}" for metric in BOOTSTRAP_METRICS for bound in ('Low', 'High')]
+
+
+def stationary_bootstrap_indices(n_rows: int, n_replicates: int, block_length: float, seed: int = 42) -> np.ndarray:
+    """Politis-Romano 정상 부트스트랩 거래일 인덱스 (평균 블록 길이 block_length, 끝에서 처음으로 순환)
+
+    Returns:
+        (n_replicates, n_rows) int32 배열 - 모든 티커가 같은 인덱스를 써서 티커 간 상관을 보존
+    """
+    rng = np.random.default_rng(seed)
+    starts = rng.integers(0, n_rows, size=(n_replicates, n_rows))
+    new_block = rng.random((n_replicates, n_rows)) < 1.0 / max(block_length, 1.0)
+    new_block[:, 0] = True
+
+    # 각 위치가 속한 블록의 시작 위치와 그 시작 인덱스에서 떨어진 거리
+    positions = np.arange(n_rows)
+    block_start = np.maximum.accumulate(np.where(new_block, positions, 0), axis=1)
+    offset = positions - block_start
+    return ((np.take_along_axis(starts, block_start, axis=1) + offset) % n_rows).astype(np.int32)
+
+
+def replicate_metrics(values: np.ndarray, indices: np.ndarray, daily_risk_free_rate: float, risk_free_rate: float,
+                      costs: np.ndarray, annual_factor: int = 252) -> np.ndarray:
+    """재표본별 연 수익률/샤프/소르티노/최대 낙폭 (compute_risk_metrics와 같은 정의)
+
+    Returns:
+        (len(BOOTSTRAP_METRICS), 반복, 티커) 배열
+    """
+    x = values[indices]  # (반복, 거래일, 티커)
+    invalid = np.isnan(x)
+    x[invalid] = 0.0
+    count = x.shape[1] - invalid.sum(axis=1)
+    n_rows = x.shape[1]
+    work = np.empty_like(x)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 결측은 0이므로 합/제곱합만으로 평균과 분산 계산 (일별 수익률이라 자릿수 손실은 무시할 수준)
+        total = x.sum(axis=1)
+        mean = total / count
+        np.multiply(x, x, out=work)
+        annual_vol = np.sqrt(np.maximum(work.sum(axis=1) - total * mean, 0.0) / (count - 1) * annual_factor)
+        annual_return = mean * annual_factor - costs
+
+        # 하방 수익률 (기준 미만만 남기고 전체 거래일 기준)
+        np.copyto(work, 0.0)
+        np.copyto(work, x, where=x < daily_risk_free_rate)
+        down_total = work.sum(axis=1)
+        work *= work
+        down_m2 = np.maximum(work.sum(axis=1) - down_total * down_total / n_rows, 0.0)
+        downside_risk = np.sqrt(down_m2 / (n_rows - 1) * annual_factor)
+
+        excess = annual_return - risk_free_rate
+        sharpe = np.where(annual_vol > 1e-6, excess / annual_vol, 0.0)
+        sortino = np.where(downside_risk > 1e-6, excess / downside_risk, 0.0)
+
+        # 고점 대비 낙폭 (첫 유효 수익률 이전은 고점 계산에서 제외)
+        x += 1.0
+        wealth = np.cumprod(x, axis=1, out=x)
+        started = np.logical_or.accumulate(~invalid, axis=1, out=invalid)
+        # 시작 전 거래일은 고점을 0으로 두어 비율이 +inf가 되므로 최솟값에서 빠짐
+        np.copyto(work, 0.0)
+        np.copyto(work, wealth, where=started)
+        peak = np.maximum.accumulate(work, axis=1, out=work)
+        np.divide(wealth, peak, out=wealth)
+        max_drawdown = np.minimum(wealth.min(axis=1), 1.0) - 1.0
+
+    return np.stack([annual_return, sharpe, sortino, max_drawdown])
+
+
+def _bootstrap_columns(values: np.ndarray, indices: np.ndarray, daily_risk_free_rate: float, risk_free_rate: float,
+                       costs: np.ndarray, annual_factor: int, max_elements: int) -> np.ndarray:
+    """티커/반복 묶음으로 나눠 재표본 지표 계산 (한 묶음의 (반복 x 거래일 x 티커) 원소 수를 max_elements로 제한)"""
+    n_replicates, n_rows = indices.shape
+    n_cols = values.shape[1]
+    out = np.empty((len(BOOTSTRAP_METRICS), n_replicates, n_cols))
+    width = max(1, min(n_cols, max_elements // max(n_rows, 1)))
+    for start in range(0, n_cols, width):
+        stop = min(start + width, n_cols)
+        step = max(1, max_elements // (n_rows * (stop - start)))
+        for r in range(0, n_replicates, step):
+            out[:, r:r + step, start:stop] = replicate_metrics(values[:, start:stop], indices[r:r + step],
+                                                               daily_risk_free_rate, risk_free_rate,
+                                                               costs[start:stop], annual_factor)
+    return out
+
+
+def bootstrap_intervals(values: np.ndarray, daily_risk_free_rate: float, risk_free_rate: float, costs: np.ndarray,
+                        n_replicates: int = 500, block_length: float = 21, confidence: float = 0.9,
+                        seed: int = 42, n_jobs: int = 1, annual_factor: int = 252,
+                        max_elements: int = 1_000_000) -> np.ndarray:
+    """BOOTSTRAP_METRICS의 티커별 부트스트랩 신뢰구간
+
+    재표본 인덱스를 한 번만 만들어 모든 묶음/프로세스가 공유하므로 n_jobs, max_elements와
+    관계없이 결과가 같습니다. n_jobs > 1이면 티커를 나눠 프로세스 풀에서 계산합니다.
+
+    Returns:
+        (티커, BOOTSTRAP_COLUMNS) 배열 - 지표마다 [하한, 상한], 관측이 부족하면 NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    out = np.full((n_cols, len(BOOTSTRAP_COLUMNS)), np.nan)
+    if n_rows < 2 or n_cols == 0:
+        return out
+
+    costs = np.broadcast_to(np.asarray(costs, dtype=np.float64), (n_cols,))
+    indices = stationary_bootstrap_indices(n_rows, n_replicates, block_length, seed)
+    args = (daily_risk_free_rate, risk_free_rate)
+
+    if n_jobs > 1 and n_cols > 1:
+        groups = np.array_split(np.arange(n_cols), min(n_jobs, n_cols))
+        # Streamlit 서버 스레드가 잡은 락을 물려받지 않도록 fork 대신 spawn 사용
+        with ProcessPoolExecutor(max_workers=len(groups), mp_context=multiprocessing.get_context('spawn')) as executor:
+            parts = list(executor.map(_bootstrap_columns, [values[:, g] for g in groups], [indices] * len(groups),
+                                      *[[a] * len(groups) for a in args], [costs[g] for g in groups],
+                                      [annual_factor] * len(groups), [max_elements] * len(groups)))
+        samples = np.concatenate(parts, axis=2)
+    else:
+        samples = _bootstrap_columns(values, indices, *args, costs, annual_factor, max_elements)
+
+    tail = (1.0 - confidence) / 2
+    bounds = np.quantile(samples, [tail, 1.0 - tail], axis=1)  # (2, 지표, 티커)
+    out[:] = bounds.transpose(2, 1, 0).reshape(n_cols, -1)
+    out[(~np.isnan(values)).sum(axis=0) < 2] = np.nan
+    return out
@@ -0,0 +1,142 @@
+# 저장 가능한 클러스터 모델 (RobustScaler + UMAP + KMeans)
+# 전체 재학습 없이 새로 편입된 ETF를 transform/predict로 기존 클러스터에 배치
+
+import pickle
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import umap.umap_ as umap
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.preprocessing import RobustScaler
+
+from utils.umap_search import ann_graph
+
+MODEL_VERSION = 1  # 저장 형식이나 학습 절차가 바뀌면 올림 (이전 버전 파일은 무시)
+
+
+def _clean(data: pd.DataFrame) -> np.ndarray:
+    return data.replace([np.inf, -np.inf], np.nan).fillna(0).to_numpy(dtype=float)
+
+
+class ClusterModel:
+    """한 투자 기간의 클러스터 모델
+
+    학습에 쓴 티커는 학습 당시 라벨을 그대로 쓰고, 새 티커만 스케일러 -> UMAP transform ->
+    KMeans predict로 배치합니다. reference는 학습 당시 스케일된 지표로 드리프트 계산에 씁니다.
+    """
+
+    def __init__(self, features: list, tickers: list, labels: np.ndarray, scaler: RobustScaler, reducer,
+                 kmeans, reference: np.ndarray, umap_params: tuple, random_state: int = 42, fitted_at: str = None):
+        self.version = MODEL_VERSION
+        self.features = list(features)
+        self.tickers = list(tickers)
+        self.labels = np.asarray(labels, dtype=int)
+        self.scaler = scaler
+        self.reducer = reducer
+        self.kmeans = kmeans  # 클러스터가 1개면 None
+        self.reference = reference
+        self.umap_params = tuple(umap_params)
+        self.random_state = random_state
+        self.fitted_at = fitted_at or datetime.now().isoformat()
+
+    @classmethod
+    def fit(cls, data: pd.DataFrame, umap_params: tuple, n_clusters: int, random_state: int = 42,
+            large_universe_options: dict = None, centers: np.ndarray = None):
+        """optimize_clustering이 고른 (n_neighbors, min_dist)와 k로 모델 학습
+
+        같은 시드/입력이면 optimize_clustering과 같은 임베딩과 라벨이 나옵니다.
+        large_universe_options가 있으면 근사 최근접 이웃 그래프(검색 인덱스 포함, transform에 사용)와
+        MiniBatchKMeans로 학습합니다. centers(optimize_clustering이 고른 k의 중심)가 있으면 처음부터 다시 찾지 않고
+        그 중심에서 한 번만 이어 학습합니다.
+        """
+        scaler = RobustScaler()
+        scaled = scaler.fit_transform(_clean(data))
+        n_neighbors, min_dist = umap_params
+        options = {}
+        if large_universe_options:
+            options = {'precomputed_knn': ann_graph(scaled, n_neighbors, random_state),
+                       'n_epochs': large_universe_options.get('n_epochs')}
+        reducer = umap.UMAP(n_components=min(3, scaled.shape[1]), n_neighbors=n_neighbors, min_dist=min_dist,
+                            random_state=random_state, **options)
+        embedding = reducer.fit_transform(scaled)
+        init = {}
+        if centers is not None and np.shape(centers) == (n_clusters, embedding.shape[1]):
+            init = {'init': np.asarray(centers, dtype=embedding.dtype), 'n_init': 1}
+        if n_clusters >= 2 and large_universe_options:
+            kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=1024, random_state=random_state,
+                                     **(init or {'n_init': 3}))
+            labels = kmeans.fit_predict(embedding)
+        elif n_clusters >= 2:
+            kmeans = KMeans(n_clusters=n_clusters, random_state=random_state, **(init or {'n_init': 'auto'}))
+            labels = kmeans.fit_predict(embedding)
+        else:
+            kmeans, labels = None, np.zeros(len(embedding), dtype=int)
+        return cls(data.columns, data.index, labels, scaler, reducer, kmeans, scaled, umap_params, random_state)
+
+    @classmethod
+    def from_fitted(cls, data: pd.DataFrame, labels: np.ndarray, scaler: RobustScaler, reducer, kmeans,
+                    umap_params: tuple, random_state: int = 42):
+        """optimize_clustering이 이미 학습한 스케일러/UMAP/KMeans로 모델 구성 (다시 학습하지 않음)"""
+        reference = scaler.transform(_clean(data))
+        return cls(data.columns, data.index, labels, scaler, reducer, kmeans, reference, umap_params, random_state)
+
+    def predict(self, data: pd.DataFrame) -> np.ndarray:
+        """학습에 없던 티커의 클러스터 (UMAP transform 후 가장 가까운 KMeans 중심)"""
+        if len(data) == 0:
+            return np.zeros(0, dtype=int)
+        if self.kmeans is None:
+            return np.zeros(len(data), dtype=int)
+        embedding = self.reducer.transform(self.scaler.transform(_clean(data[self.features])))
+        return self.kmeans.predict(embedding)
+
+    def assign(self, data: pd.DataFrame) -> np.ndarray:
+        """data 행 순서대로 라벨 (기존 티커는 학습 라벨, 새 티커는 predict)"""
+        known = dict(zip(self.tickers, self.labels))
+        labels = np.array([known.get(tk, -1) for tk in data.index], dtype=int)
+        new_rows = labels < 0
+        if new_rows.any():
+            labels[new_rows] = self.predict(data[new_rows])
+        return labels
+
+    def drift(self, data: pd.DataFrame) -> dict:
+        """학습 이후 변화량
+
+        feature_drift: 기존 티커의 스케일된 지표 이동 거리 평균 / 학습 당시 중심까지 거리 평균
+        new_ratio: 학습에 없던 티커 비율
+        """
+        data = data[self.features]
+        positions = {tk: i for i, tk in enumerate(self.tickers)}
+        rows = [positions[tk] for tk in data.index if tk in positions]
+        known = data.index.isin(self.tickers)
+        new_ratio = float((~known).mean()) if len(data) else 0.0
+        if not rows:
+            return {'feature_drift': np.inf, 'new_ratio': new_ratio}
+
+        current = self.scaler.transform(_clean(data[known]))
+        reference = self.reference[rows]
+        spread = np.linalg.norm(self.reference - np.median(self.reference, axis=0), axis=1).mean()
+        moved = np.linalg.norm(current - reference, axis=1).mean()
+        return {'feature_drift': float(moved / spread) if spread > 0 else np.inf, 'new_ratio': new_ratio}
+
+    def age_days(self) -> float:
+        return (datetime.now() - datetime.fromisoformat(self.fitted_at)).total_seconds() / 86400
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(self, f)
+        tmp_path.replace(path)
+
+    @staticmethod
+    def load(path):
+        """저장된 모델 (없거나 버전이 다르면 None)"""
+        try:
+            with open(path, 'rb') as f:
+                model = pickle.load(f)
+        except Exception:
+            return None
+        return model if getattr(model, 'version', None) == MODEL_VERSION else None
@@ -0,0 +1,90 @@
+# 클러스터링 결과 디스크 캐시
+# 스케일된 입력 행렬과 파라미터의 해시를 키로 임베딩/라벨/진단값/학습된 모델을 저장 (수정 시각 기준 LRU, 용량 상한)
+
+import hashlib
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+class ClusteringCache:
+    """내용 주소 기반 클러스터링 결과 캐시
+
+    같은 지표 행렬과 파라미터면 사용자와 관계없이 결과가 같으므로 파일 하나를 읽어 바로 반환합니다.
+    조회할 때마다 파일 수정 시각을 갱신하고, 전체 크기나 개수가 상한을 넘으면 가장 오래 안 쓴 항목부터 지웁니다.
+    학습된 스케일러/UMAP/KMeans 같은 객체는 pickle 바이트로 같은 파일에 담아 항목 단위로 함께 지워지게 합니다.
+    """
+
+    def __init__(self, root, max_bytes: int = 64 * 1024 * 1024, max_entries: int = 256):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(data: np.ndarray, **params) -> str:
+        """입력 행렬(모양, dtype, 값)과 파라미터(JSON 직렬화)로 만든 sha1 키"""
+        data = np.ascontiguousarray(data, dtype=np.float64)
+        digest = hashlib.sha1()
+        digest.update(repr(data.shape).encode('utf-8'))
+        digest.update(data.tobytes())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def get(self, key: str):
+        """저장된 (배열 dict, meta, 객체 dict) - 없거나 읽을 수 없으면 None"""
+        path = self._path(key)
+        with self.lock:
+            try:
+                with np.load(path, allow_pickle=False) as data:
+                    meta = json.loads(str(data['__meta__']))
+                    objects = pickle.loads(data['__objects__'].tobytes()) if '__objects__' in data.files else {}
+                    arrays = {name: data[name] for name in data.files if name not in ('__meta__', '__objects__')}
+                os.utime(path)  # LRU 순서 갱신
+            except Exception:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return arrays, meta, objects
+
+    def put(self, key: str, arrays: dict, objects: dict = None, **meta):
+        payload = dict(arrays)
+        payload['__meta__'] = np.array(json.dumps(meta, ensure_ascii=False, default=float))
+        if objects:
+            payload['__objects__'] = np.frombuffer(pickle.dumps(objects), dtype=np.uint8)
+        path = self._path(key)
+        tmp_path = path.with_name(path.name + '.tmp')
+        with self.lock:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **payload)
+            os.replace(tmp_path, path)
+            self._evict()
+
+    def _evict(self):
+        entries = []
+        for path in self.root.glob('*.npz'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+            _, size, path = entries.pop(0)
+            path.unlink(missing_ok=True)
+            total -= size
+
+    def stats(self) -> dict:
+        sizes = [path.stat().st_size for path in self.root.glob('*.npz')]
+        return {'entries': len(sizes), 'bytes': int(sum(sizes)), 'hits': self.hits, 'misses': self.misses}
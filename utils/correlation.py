@@ -0,0 +1,105 @@
+# 유니버스 전체 상관/공분산 행렬 캐시
+# 결측을 고려한 행렬곱 몇 번으로 모든 티커 쌍을 한 번에 계산하고 float32로 보관
+
+import numpy as np
+import pandas as pd
+from sklearn.covariance import ledoit_wolf_shrinkage
+
+
+def pairwise_covariance(values: np.ndarray):
+    """두 티커 수익률이 모두 있는 거래일만 쓰는 쌍별 공분산/상관계수 (pandas DataFrame.cov/corr와 같음)
+
+    Returns:
+        (공분산, 상관계수, 쌍별 관측 수) - 관측이 2개 미만인 쌍은 NaN
+    """
+    valid = ~np.isnan(values)
+    # 열 평균을 빼서 행렬곱의 자릿수 손실을 줄임 (공분산은 평행이동에 불변)
+    center = np.nan_to_num(np.nanmean(np.where(valid, values, np.nan), axis=0)) if values.size else 0.0
+    x = np.where(valid, values - center, 0.0)
+    mask = valid.astype(np.float64)
+
+    count = mask.T @ mask            # n_ij
+    sums = x.T @ mask                # i열 합 (j가 있는 거래일)
+    squares = (x * x).T @ mask       # i열 제곱합 (j가 있는 거래일)
+    cross = x.T @ x                  # i, j 곱의 합
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        covariance = (cross - sums * sums.T / count) / (count - 1)
+        var_i = np.maximum(squares - sums * sums / count, 0.0)
+        correlation = (cross - sums * sums.T / count) / np.sqrt(var_i * var_i.T)
+    enough = count >= 2
+    covariance = np.where(enough, covariance, np.nan)
+    correlation = np.clip(np.where(enough, correlation, np.nan), -1.0, 1.0)
+    np.fill_diagonal(correlation, np.where(np.diag(count) >= 2, 1.0, np.nan))
+    return covariance, correlation, count
+
+
+class CorrelationMatrix:
+    """투자 기간별 유니버스 전체 상관/공분산 행렬 (float32, 데이터 버전으로 무효화)
+
+    쌍 조회, 기준 ETF 대비 전체 순위, 히트맵은 모두 이 행렬을 잘라 쓰면 됩니다.
+    """
+
+    def __init__(self, tickers: list, correlation: np.ndarray, covariance: np.ndarray,
+                 shrinkage: float = 0.0, data_version: str = None):
+        self.tickers = list(tickers)
+        self.positions = {tk: i for i, tk in enumerate(self.tickers)}
+        self.correlation = correlation.astype(np.float32, copy=False)
+        self.covariance = covariance.astype(np.float32, copy=False)  # 일별 수익률 기준
+        self.shrinkage = shrinkage
+        self.data_version = data_version
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, shrink: bool = False, data_version: str = None):
+        """수익률로 행렬 생성
+
+        shrink가 True면 Ledoit-Wolf 축소 강도로 공분산을 대각 목표(평균 분산 x 단위행렬)쪽으로
+        당기고, 상관계수도 축소된 공분산에서 다시 계산합니다.
+        """
+        values = returns.to_numpy(dtype=np.float64)
+        covariance, correlation, _ = pairwise_covariance(values)
+
+        shrinkage = 0.0
+        if shrink and values.shape[1] > 1:
+            # 축소 강도는 결측을 0(평균)으로 채운 중심화 수익률로 추정
+            centered = np.nan_to_num(values - np.nanmean(values, axis=0))
+            shrinkage = float(ledoit_wolf_shrinkage(centered, assume_centered=True))
+            target = np.nanmean(np.diag(covariance))
+            covariance = (1 - shrinkage) * covariance + shrinkage * target * np.eye(len(covariance))
+            std = np.sqrt(np.diag(covariance))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                correlation = np.clip(covariance / np.outer(std, std), -1.0, 1.0)
+
+        return cls(returns.columns, correlation, covariance, shrinkage, data_version)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.correlation.nbytes + self.covariance.nbytes)
+
+    def sub(self, tickers: list, kind: str = 'correlation') -> pd.DataFrame:
+        """티커 부분 행렬 (히트맵용)"""
+        tickers = [tk for tk in tickers if tk in self.positions]
+        idx = [self.positions[tk] for tk in tickers]
+        matrix = self.correlation if kind == 'correlation' else self.covariance
+        return pd.DataFrame(matrix[np.ix_(idx, idx)].astype(np.float64), index=tickers, columns=tickers)
+
+    def against(self, ticker: str, kind: str = 'correlation') -> pd.Series:
+        """기준 티커와 나머지 모든 티커의 상관계수(또는 공분산)"""
+        if ticker not in self.positions:
+            return pd.Series(np.nan, index=self.tickers)
+        matrix = self.correlation if kind == 'correlation' else self.covariance
+        return pd.Series(matrix[self.positions[ticker]].astype(np.float64), index=self.tickers)
+
+    def pair(self, a: str, b: str) -> float:
+        if a not in self.positions or b not in self.positions:
+            return np.nan
+        return float(self.correlation[self.positions[a], self.positions[b]])
+
+    def to_arrays(self):
+        """PriceStore.save_arrays에 넘길 (배열 dict, meta dict)"""
+        return ({'correlation': self.correlation, 'covariance': self.covariance},
+                {'tickers': self.tickers, 'shrinkage': self.shrinkage, 'data_version': self.data_version})
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, meta: dict):
+        return cls(meta['tickers'], arrays['correlation'], arrays['covariance'], meta['shrinkage'], meta['data_version'])
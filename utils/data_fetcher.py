@@ -0,0 +1,333 @@
+# ETF 가격 데이터 병렬 수집 모듈
+# 시장(KR/US)별 요청 속도 제한과 지수 백오프 재시도를 적용한 동시 다운로드 엔진
+
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+def get_market(ticker: str) -> str:
+    """티커로 시장 구분 (6자리 숫자면 KR, 그 외 US)"""
+    return 'KR' if ticker.isdigit() and len(ticker) == 6 else 'US'
+
+
+def extract_close_series(df_raw: pd.DataFrame):
+    """DataReader 결과에서 종가 시리즈 추출 (유효하지 않으면 None)
+
+    결측 보간은 여기서 하지 않고, 저장소에서 여러 티커를 한 번에 정렬할 때
+    2차원 배열 전체에 적용합니다 (price_store.fill_price_matrix).
+    """
+    if df_raw is None or df_raw.empty:
+        return None
+
+    close_col = 'Adj Close' if 'Adj Close' in df_raw.columns else 'Close'
+    if close_col not in df_raw.columns:
+        return None
+
+    series = df_raw[close_col].replace([np.inf, -np.inf], np.nan).dropna()
+
+    if len(series) < 2:
+        return None
+
+    return series[~series.index.duplicated(keep='first')]
+
+
+class TokenBucket:
+    """스레드 안전한 토큰 버킷 (초당 rate개 요청, 최대 capacity개 버스트)"""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """토큰 1개를 얻을 때까지 대기"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class NegativeCache:
+    """반복적으로 실패한 티커를 TTL 동안 건너뛰는 영구 음성 캐시
+
+    failure_threshold번 연속 실패하면 ttl_hours 동안 건너뛰고, 이후에도 계속 실패하면
+    건너뛰는 기간을 두 배씩 늘립니다 (최대 max_ttl_hours). 한 번이라도 성공하면 해제됩니다.
+    """
+
+    def __init__(self, path, ttl_hours: float = 24, failure_threshold: int = 2, max_ttl_hours: float = 24 * 7):
+        self.path = Path(path)
+        self.ttl_hours = ttl_hours
+        self.failure_threshold = failure_threshold
+        self.max_ttl_hours = max_ttl_hours
+        self.lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self) -> dict:
+        if not self.path.exists():
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def save(self):
+        with self.lock:
+            payload = json.dumps(self.entries, ensure_ascii=False, indent=1)
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(payload)
+        os.replace(tmp_path, self.path)
+
+    def skip_reason(self, ticker: str, now: datetime = None):
+        """건너뛰어야 하면 사유 문자열, 아니면 None"""
+        with self.lock:
+            entry = self.entries.get(ticker)
+        if not entry or not entry.get('skip_until'):
+            return None
+        if datetime.fromisoformat(entry['skip_until']) <= (now or datetime.now()):
+            return None
+        return f"{entry['failures']}회 연속 실패 ({entry['last_error']}), {entry['skip_until'][:16]}까지 건너뜀"
+
+    def record_failure(self, ticker: str, error: str):
+        now = datetime.now()
+        with self.lock:
+            entry = self.entries.setdefault(ticker, {'failures': 0})
+            entry['failures'] += 1
+            entry['last_error'] = error
+            entry['last_failed'] = now.isoformat()
+            if entry['failures'] >= self.failure_threshold:
+                ttl = min(self.max_ttl_hours, self.ttl_hours * 2 ** (entry['failures'] - self.failure_threshold))
+                entry['skip_until'] = (now + timedelta(hours=ttl)).isoformat()
+
+    def record_success(self, ticker: str):
+        with self.lock:
+            self.entries.pop(ticker, None)
+
+    def report(self) -> list:
+        """현재 기록된 실패 티커와 건너뛰는 사유"""
+        with self.lock:
+            entries = {tk: dict(entry) for tk, entry in self.entries.items()}
+        now = datetime.now()
+        return [
+            {
+                'ticker': tk,
+                'market': get_market(tk),
+                'failures': entry['failures'],
+                'last_error': entry.get('last_error'),
+                'last_failed': entry.get('last_failed'),
+                'skip_until': entry.get('skip_until'),
+                'skipping': bool(entry.get('skip_until')) and datetime.fromisoformat(entry['skip_until']) > now
+            }
+            for tk, entry in sorted(entries.items())
+        ]
+
+
+class CircuitBreaker:
+    """데이터 소스(시장)별 서킷 브레이커
+
+    연속 failure_threshold번 요청 오류가 나면 cooldown_seconds 동안 해당 소스 요청을 모두 막고,
+    쿨다운이 끝나면 한 번의 시험 요청(half-open) 결과로 다시 열지/닫을지 결정합니다.
+    """
+
+    def __init__(self, failure_threshold: int = 10, cooldown_seconds: float = 300):
+        self.failure_threshold = failure_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.half_open_trial = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            if time.monotonic() - self.opened_at >= self.cooldown_seconds:
+                return 'half_open'
+            return 'open'
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown_seconds or self.half_open_trial:
+                return False
+            self.half_open_trial = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.half_open_trial = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive_failures += 1
+            if self.half_open_trial or self.consecutive_failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.half_open_trial = False
+
+
+class ConcurrentFetcher:
+    """제한된 워커 수로 티커를 동시에 다운로드하는 수집 엔진
+
+    reader는 fdr.DataReader와 같은 (ticker, start, end) 시그니처의 함수이며,
+    지연/실패를 주입하는 가짜 DataReader로 교체해 오프라인에서 검증할 수 있습니다.
+    """
+
+    def __init__(self, reader, max_workers: int = 8, rate_limits: dict = None,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0,
+                 negative_cache: NegativeCache = None, circuit_breakers: dict = None):
+        self.reader = reader
+        self.negative_cache = negative_cache
+        self.circuit_breakers = circuit_breakers or {}
+        self.skipped = {}  # 직전 fetch에서 건너뛴 티커와 사유
+        self.max_workers = max(1, int(max_workers))
+        self.max_retries = max(1, int(max_retries))
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        rate_limits = rate_limits or {'KR': 5.0, 'US': 5.0}
+        self.buckets = {market: TokenBucket(rate) for market, rate in rate_limits.items()}
+
+    def backoff_delay(self, attempt: int) -> float:
+        """지터가 적용된 지수 백오프 대기 시간 (full jitter)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** (attempt - 1))))
+
+    def fetch_one(self, ticker: str, start: str, end: str):
+        """단일 티커 다운로드 (속도 제한 + 재시도)
+
+        Returns:
+            (종가 시리즈 또는 None, 실패 사유) - 소스 차단으로 건너뛰면 사유가 'circuit_open'
+        """
+        market = get_market(ticker)
+        bucket = self.buckets.get(market)
+        breaker = self.circuit_breakers.get(market)
+        error = 'empty'
+
+        for attempt in range(1, self.max_retries + 1):
+            if breaker is not None and not breaker.allow():
+                return None, 'circuit_open'
+            if bucket is not None:
+                bucket.acquire()
+            try:
+                series = extract_close_series(self.reader(ticker, start, end))
+                if breaker is not None:
+                    breaker.record_success()
+                if series is not None:
+                    return series, None
+                error = 'empty'
+            except Exception as e:
+                if breaker is not None:
+                    breaker.record_failure()
+                error = f"{type(e).__name__}: {e}"[:200]
+
+            if attempt < self.max_retries:
+                time.sleep(self.backoff_delay(attempt))
+        return None, error
+
+    def fetch(self, tickers: list, start: str, end: str, progress_callback=None):
+        """티커 목록을 동일 기간으로 동시에 다운로드
+
+        Returns:
+            (티커별 종가 시리즈 dict, 실패한 티커 목록)
+        """
+        return self.fetch_ranges({tk: (start, end) for tk in tickers}, progress_callback)
+
+    def fetch_ranges(self, ranges: dict, progress_callback=None, modes: dict = None):
+        """티커별 기간이 다른 다운로드 (증분 갱신용)
+
+        Args:
+            ranges: {티커: (start, end)}
+            modes: {티커: 'full'/'head'/'tail'} - 부분 구간('head'/'tail') 실패는 휴장일처럼 새 데이터가 없는
+                경우가 많으므로 음성 캐시에 기록하지 않음 (없으면 모두 'full')
+
+        Returns:
+            (티커별 종가 시리즈 dict, 실패한 티커 목록)
+        """
+        results = {}
+        failed = []
+        self.skipped = {}
+
+        # 음성 캐시에 걸린 티커는 요청하지 않음
+        tickers = []
+        for tk in ranges:
+            reason = self.negative_cache.skip_reason(tk) if self.negative_cache is not None else None
+            if reason:
+                self.skipped[tk] = reason
+            else:
+                tickers.append(tk)
+
+        total = len(tickers)
+        if total == 0:
+            return results, failed
+
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, total)) as executor:
+            futures = {executor.submit(self.fetch_one, tk, *ranges[tk]): tk for tk in tickers}
+            for done, future in enumerate(as_completed(futures), start=1):
+                tk = futures[future]
+                try:
+                    series, error = future.result()
+                except Exception as e:
+                    series, error = None, type(e).__name__
+
+                if series is not None:
+                    results[tk] = series
+                    if self.negative_cache is not None:
+                        self.negative_cache.record_success(tk)
+                elif error == 'circuit_open':
+                    self.skipped[tk] = f"{get_market(tk)} 데이터 소스 차단 중 (서킷 브레이커)"
+                else:
+                    failed.append(tk)
+                    if self.negative_cache is not None and (modes or {}).get(tk, 'full') == 'full':
+                        self.negative_cache.record_failure(tk, error)
+
+                if progress_callback is not None:
+                    progress_callback(done, total, tk)
+
+        if self.negative_cache is not None:
+            self.negative_cache.save()
+
+        # 완료 순서가 아닌 요청 순서로 정렬
+        failed_set = set(failed)
+        return results, [tk for tk in tickers if tk in failed_set]
+
+
+def merge_price_history(old: pd.Series, new: pd.Series, rtol: float = 1e-4):
+    """기존 가격 이력에 증분 데이터를 병합
+
+    겹치는 날짜의 가격이 rtol 이상 달라졌다면 배당/분할 등으로 과거 가격이
+    수정(restated)된 것이므로 병합하지 않고 전체 재다운로드가 필요함을 알립니다.
+
+    Returns:
+        (병합된 시리즈, 수정 가격 감지 여부)
+    """
+    old = old.dropna()
+    overlap = old.index.intersection(new.index)
+    if len(overlap) > 0:
+        before = old.loc[overlap].to_numpy(dtype=float)
+        after = new.loc[overlap].to_numpy(dtype=float)
+        if not np.allclose(after, before, rtol=rtol, atol=0.0, equal_nan=True):
+            return old, True
+
+    merged = pd.concat([old[~old.index.isin(new.index)], new]).sort_index()
+    return merged, False
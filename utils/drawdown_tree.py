@@ -0,0 +1,87 @@
+# 임의 기간 최대 낙폭 조회용 세그먼트 트리
+# 티커별 누적 로그수익률(로그 자산) 위에 구간별 최고점/최저점/최대 하락 위치를 저장해 O(log T)로 조회
+
+import numpy as np
+
+
+class DrawdownTree:
+    """(거래일, 티커) 로그 자산 배열에 대한 최대 낙폭 세그먼트 트리
+
+    각 노드는 구간의 최고점 위치, 최저점 위치, 최대 하락의 고점/저점 위치만 int32로 보관하고
+    값은 원래 로그 자산 배열에서 읽습니다. 두 구간을 합칠 때의 최대 하락은
+    min(왼쪽 최대 하락, 오른쪽 최대 하락, 오른쪽 최저점 - 왼쪽 최고점) 입니다.
+    """
+
+    def __init__(self, log_wealth: np.ndarray):
+        self.log_wealth = np.asarray(log_wealth, dtype=np.float64)
+        self.size, self.width = self.log_wealth.shape
+        self.columns = np.arange(self.width)
+
+        # 노드 배열: [argmax, argmin, peak, trough] x (2 * size) x 티커
+        nodes = np.zeros((4, 2 * self.size, self.width), dtype=np.int32)
+        leaves = np.broadcast_to(np.arange(self.size, dtype=np.int32)[:, None], (self.size, self.width))
+        nodes[:, self.size:] = leaves
+
+        # 자식 노드가 모두 계산된 구간부터 아래에서 위로 한 번에 채움
+        hi = self.size
+        while hi > 1:
+            lo = (hi + 1) // 2
+            parents = np.arange(lo, hi)
+            nodes[:, lo:hi] = self._combine(nodes[:, 2 * parents], nodes[:, 2 * parents + 1])
+            hi = lo
+        self.nodes = nodes
+
+    def _values(self, positions: np.ndarray) -> np.ndarray:
+        return self.log_wealth[positions, self.columns]
+
+    def _combine(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """시간 순서상 left 다음에 right가 오는 두 구간 요약을 합침"""
+        left_max, left_min, left_peak, left_trough = left
+        right_max, right_min, right_peak, right_trough = right
+
+        arg_max = np.where(self._values(right_max) > self._values(left_max), right_max, left_max)
+        arg_min = np.where(self._values(right_min) < self._values(left_min), right_min, left_min)
+
+        left_drop = self._values(left_trough) - self._values(left_peak)
+        right_drop = self._values(right_trough) - self._values(right_peak)
+        cross_drop = self._values(right_min) - self._values(left_max)
+
+        use_right = right_drop < left_drop
+        peak = np.where(use_right, right_peak, left_peak)
+        trough = np.where(use_right, right_trough, left_trough)
+        use_cross = cross_drop < np.minimum(left_drop, right_drop)
+        peak = np.where(use_cross, left_max, peak)
+        trough = np.where(use_cross, right_min, trough)
+        return np.stack([arg_max, arg_min, peak, trough])
+
+    def query(self, first: int, last: int):
+        """[first, last] 거래일 위치 구간의 최대 낙폭
+
+        Returns:
+            (낙폭 배열 (0 이하, 단순 수익률 기준), 고점 위치 배열, 저점 위치 배열)
+        """
+        first, last = max(0, int(first)), min(self.size - 1, int(last))
+        if first > last:
+            raise ValueError("빈 구간입니다.")
+
+        left_acc = right_acc = None
+        lo, hi = first + self.size, last + 1 + self.size
+        while lo < hi:
+            if lo & 1:
+                left_acc = self.nodes[:, lo] if left_acc is None else self._combine(left_acc, self.nodes[:, lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right_acc = self.nodes[:, hi] if right_acc is None else self._combine(self.nodes[:, hi], right_acc)
+            lo //= 2
+            hi //= 2
+
+        if left_acc is None:
+            result = right_acc
+        elif right_acc is None:
+            result = left_acc
+        else:
+            result = self._combine(left_acc, right_acc)
+        peak, trough = result[2], result[3]
+        drawdown = np.expm1(self._values(trough) - self._values(peak))
+        return drawdown, peak, trough
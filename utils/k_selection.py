@@ -0,0 +1,139 @@
+# KMeans 클러스터 수(k) 선택
+# 엘보는 WCSS 차이 곡선의 최댓값을 황금분할 탐색으로 찾아 일부 k만 학습하고,
+# 실루엣/CH는 k를 늘려 가며 이전 해의 가장 퍼진 클러스터를 둘로 나눠 이어 학습한 전체 스윕으로 점수 계산
+
+import numpy as np
+from kneed import KneeLocator
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import calinski_harabasz_score
+
+from utils.umap_search import sampled_silhouette
+
+K_CRITERIA = ('elbow', 'silhouette', 'calinski_harabasz')
+
+
+def _nearest(data: np.ndarray, centers: np.ndarray) -> np.ndarray:
+    return ((data[:, None, :] - centers[None, :, :]) ** 2).sum(axis=-1).argmin(axis=1)
+
+
+def split_worst_cluster(data: np.ndarray, centers: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """제곱 오차 합이 가장 큰 클러스터의 중심을 제1주성분 방향 ±1 표준편차 위치의 두 중심으로 교체"""
+    sse = np.bincount(labels, ((data - centers[labels]) ** 2).sum(axis=1), minlength=len(centers))
+    worst = int(np.argmax(sse))
+    members = data[labels == worst]
+    offset = np.zeros(data.shape[1])
+    if len(members) >= 2:
+        _, singular, vt = np.linalg.svd(members - members.mean(axis=0), full_matrices=False)
+        offset = vt[0] * singular[0] / np.sqrt(len(members))
+    return np.vstack([np.delete(centers, worst, axis=0), centers[worst] - offset, centers[worst] + offset])
+
+
+def kmeans_sweep(data: np.ndarray, k_values: list, random_state: int = 42, mini_batch: bool = False,
+                 batch_size: int = 1024) -> dict:
+    """k를 작은 값부터 학습한 {k: 학습된 모델}
+
+    가장 작은 k만 k-means++로 처음부터 학습하고, 이후 k는 이전 해에서 가장 퍼진 클러스터를 둘로 나눈 중심에서
+    한 번만 이어 학습합니다. 학습에 실패한 k는 결과에서 빠집니다.
+    """
+    estimator = MiniBatchKMeans if mini_batch else KMeans
+    options = {'batch_size': batch_size} if mini_batch else {}
+    fits, previous = {}, None
+    for k in sorted(k_values):
+        if previous is None or previous.n_clusters >= k:
+            init, n_init = 'k-means++', 3 if mini_batch else 'auto'
+        else:
+            centers, labels = previous.cluster_centers_, previous.labels_
+            while len(centers) < k:
+                centers = split_worst_cluster(data, centers, labels)
+                labels = _nearest(data, centers)
+            init, n_init = centers, 1
+        try:
+            model = estimator(n_clusters=k, init=init, n_init=n_init, random_state=random_state, **options).fit(data)
+        except Exception:
+            continue
+        fits[k] = previous = model
+    return fits
+
+
+def elbow_search(data: np.ndarray, k_values: list, random_state: int = 42, mini_batch: bool = False,
+                 batch_size: int = 1024, sensitivity: float = 1.0):
+    """모든 k를 학습하지 않고 WCSS 곡선의 무릎 찾기 -> (무릎 k 또는 None, {k: 학습된 모델})
+
+    엘보 기준(kneed, curve='convex', direction='decreasing')의 차이 곡선
+    D(k) = (W(k_min) - W(k)) / (W(k_min) - W(k_max)) - (k - k_min) / (k_max - k_min)은 WCSS가 볼록 감소이면
+    오목(단봉)이므로, 양 끝 k를 학습한 뒤 황금분할 탐색으로 최댓값 위치만 좁혀 갑니다.
+    k마다 k-means++로 처음부터 학습하므로 학습한 k의 WCSS는 k별 독립 학습과 같고, 동점이면 작은 k를 고릅니다.
+    최댓값이 kneed 임계값(sensitivity x 정규화한 k 간격)을 넘지 않으면 무릎이 없는 것으로 봅니다.
+    k 9개(2~10)면 최대 6번 학습합니다.
+    """
+    k_values = sorted(k_values)
+    estimator = MiniBatchKMeans if mini_batch else KMeans
+    options = {'batch_size': batch_size, 'n_init': 3} if mini_batch else {'n_init': 'auto'}
+    fits = {}
+
+    def wcss(i):
+        k = k_values[i]
+        if k not in fits:
+            try:
+                fits[k] = estimator(n_clusters=k, random_state=random_state, **options).fit(data)
+            except Exception:
+                return np.nan
+        return fits[k].inertia_
+
+    span = len(k_values) - 1
+    lo, hi = 0, span
+    if span < 1:
+        if k_values:
+            wcss(0)
+        return None, fits
+    first, last = wcss(lo), wcss(hi)
+    if not first > last:
+        return None, fits
+
+    def difference(i):
+        value = (first - wcss(i)) / (first - last) - i / span
+        return value if np.isfinite(value) else -np.inf
+
+    while hi - lo > 2:
+        left = lo + int(round((hi - lo) * 0.382))
+        right = max(lo + int(round((hi - lo) * 0.618)), left + 1)
+        if difference(left) >= difference(right):
+            hi = right
+        else:
+            lo = left
+    best = lo + 1
+    if hi - lo < 2 or difference(best) <= sensitivity / span:
+        return None, fits
+    return k_values[best], fits
+
+
+def score_sweep(data: np.ndarray, fits: dict, silhouette_sample: int = None, random_state: int = 42) -> dict:
+    """학습 결과별 점수 (k 오름차순 리스트, 라벨이 한 종류뿐이면 실루엣/CH는 nan)"""
+    scores = {'k_values': [], 'wcss': [], 'silhouette': [], 'calinski_harabasz': []}
+    for k in sorted(fits):
+        labels = fits[k].labels_
+        scores['k_values'].append(int(k))
+        scores['wcss'].append(float(fits[k].inertia_))
+        if 1 < len(set(labels)) < len(data):
+            scores['silhouette'].append(sampled_silhouette(data, labels, silhouette_sample, random_state))
+            scores['calinski_harabasz'].append(float(calinski_harabasz_score(data, labels)))
+        else:
+            scores['silhouette'].append(np.nan)
+            scores['calinski_harabasz'].append(np.nan)
+    return scores
+
+
+def select_k(scores: dict, criterion: str = 'elbow', default: int = 3) -> int:
+    """기준별 최적 k (elbow: WCSS 곡선의 무릎, silhouette/calinski_harabasz: 최댓값)"""
+    if criterion not in K_CRITERIA:
+        raise ValueError(f"지원하지 않는 k 선택 기준: {criterion} (가능: {', '.join(K_CRITERIA)})")
+    k_values = scores['k_values']
+    if criterion == 'elbow':
+        if len(k_values) < 2:
+            return default
+        kl = KneeLocator(k_values, scores['wcss'], curve='convex', direction='decreasing', S=1.0)
+        return kl.elbow if kl.elbow else default
+    values = np.asarray(scores[criterion], dtype=float)
+    if not np.isfinite(values).any():
+        return default
+    return int(k_values[int(np.nanargmax(values))])
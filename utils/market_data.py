@@ -0,0 +1,326 @@
+# 프로세스 전역 시장 데이터 계층
+# 모든 Streamlit 세션이 투자 기간별로 하나의 가격/수익률/지표 사본을 공유
+
+import hashlib
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+import streamlit as st
+
+
+class MarketSnapshot:
+    """세션 간 공유되는 읽기 전용 시장 데이터
+
+    prices/returns/metrics는 모든 세션이 같은 객체를 참조하므로
+    수정이 필요하면 반드시 .copy() 후 사용해야 합니다.
+    """
+
+    def __init__(self, data_period_years: int, start: str, end: str, prices: pd.DataFrame,
+                 returns: pd.DataFrame, metrics: pd.DataFrame, risk_free_rate: float,
+                 filled_mask: pd.DataFrame = None, return_index=None, data_version: str = None,
+                 rolling_metrics=None, correlation=None, metric_intervals=None):
+        self.data_period_years = data_period_years
+        self.start = start
+        self.end = end
+        self.prices = prices
+        self.returns = returns
+        self.metrics = metrics
+        self.risk_free_rate = risk_free_rate
+        self.filled_mask = filled_mask  # 보간으로 채워진 가격 칸 (지표 계산에서 제외됨)
+        self.return_index = return_index  # 저장소 전체 이력의 누적합 인덱스 (임의 기간 수익률 조회)
+        self.data_version = data_version  # 가격/이자율 내용 해시 (파생 캐시 무효화 기준)
+        self.rolling_metrics = rolling_metrics  # 롤링 지표 계산기 (세션 간 결과 캐시 공유)
+        self.correlation = correlation  # 유니버스 전체 상관/공분산 행렬 (float32)
+        self.metric_intervals = metric_intervals  # 주요 지표 부트스트랩 신뢰구간 DataFrame
+        self.created_at = datetime.now()
+        self.is_stale = False  # 만료 후 백그라운드 갱신이 끝나기 전까지 True
+
+    def age_seconds(self) -> float:
+        return (datetime.now() - self.created_at).total_seconds()
+
+    def memory_bytes(self) -> int:
+        frames = [df for df in (self.prices, self.returns, self.metrics, self.filled_mask, self.metric_intervals)
+                  if df is not None]
+        index_bytes = self.return_index.nbytes if self.return_index is not None else 0
+        index_bytes += self.correlation.nbytes if self.correlation is not None else 0
+        return int(sum(df.memory_usage(deep=True).sum() for df in frames)) + index_bytes
+
+
+class _InFlightCall:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """같은 키의 동시 요청을 하나의 실행으로 합치는 계층
+
+    먼저 도착한 호출만 fn을 실행하고, 실행 중에 도착한 같은 키의 호출은
+    그 결과(또는 예외)를 기다렸다가 공유합니다.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = {}
+        self.key_stats = {}
+
+    def do(self, key, fn):
+        with self.lock:
+            call = self.calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self.calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        started = time.perf_counter()
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                del self.calls[key]
+                stats = self.key_stats.setdefault(key, {'executions': 0, 'waiters': 0, 'errors': 0,
+                                                        'last_seconds': 0.0, 'total_seconds': 0.0})
+                stats['executions'] += 1
+                stats['waiters'] += call.waiters
+                stats['errors'] += call.error is not None
+                stats['last_seconds'] = elapsed
+                stats['total_seconds'] += elapsed
+            call.event.set()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def is_in_flight(self, key) -> bool:
+        with self.lock:
+            return key in self.calls
+
+    def stats(self) -> dict:
+        """키별 실행 횟수, 합류한 대기자 수, 소요 시간"""
+        with self.lock:
+            stats = {key: dict(value) for key, value in self.key_stats.items()}
+            for key, call in self.calls.items():
+                stats.setdefault(key, {})['in_flight_waiters'] = call.waiters
+        return stats
+
+
+def universe_key(tickers: list) -> str:
+    """티커 유니버스를 짧은 해시 문자열로 식별"""
+    return hashlib.sha1(','.join(sorted(tickers)).encode('utf-8')).hexdigest()[:12]
+
+
+class MarketDataService:
+    """투자 기간(년)별 MarketSnapshot을 보관하는 프로세스 전역 서비스
+
+    builder는 인자 없이 {투자 기간: MarketSnapshot}을 만드는 함수로, 한 번의 가격 수집으로
+    모든 투자 기간의 지표/클러스터를 함께 만듭니다. 사용자 요청은 그중 한 기간을 고르기만 하며,
+    동시에 들어온 생성 요청은 SingleFlight로 하나의 실행을 공유합니다.
+    builder 인스턴스를 쓰는 다른 작업(백그라운드 가격 갱신)은 run_exclusive로 생성과 번갈아 실행합니다.
+    """
+
+    def __init__(self, builder, universe: list, max_age_hours: float = 6):
+        self.builder = builder
+        self.universe_key = universe_key(universe)
+        self.max_age_hours = max_age_hours
+        self.snapshots = {}
+        self.lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.build_lock = threading.Lock()  # 스냅샷 생성과 가격 갱신이 builder 상태를 동시에 쓰지 않도록 직렬화
+
+    def flight_key(self) -> tuple:
+        return (self.universe_key, datetime.now().strftime('%Y-%m-%d'))
+
+    def get_snapshot(self, data_period_years: int) -> MarketSnapshot:
+        """스냅샷 반환 (stale-while-revalidate)
+
+        만료된 스냅샷은 is_stale 표시와 함께 즉시 반환하고 갱신은 백그라운드에서 진행합니다.
+        스냅샷이 아예 없을 때만 호출한 세션이 생성을 기다립니다.
+        """
+        with self.lock:
+            snapshot = self.snapshots.get(data_period_years)
+        if snapshot is None:
+            snapshots = self.refresh()
+            if data_period_years not in snapshots:
+                raise ValueError(f"{data_period_years}년 기간의 시장 데이터를 만들지 못했습니다.")
+            return snapshots[data_period_years]
+
+        if snapshot.age_seconds() >= self.max_age_hours * 3600:
+            snapshot.is_stale = True
+            self.refresh_async()
+        return snapshot
+
+    def refresh(self) -> dict:
+        """모든 투자 기간의 스냅샷을 새로 생성 (동시 요청은 하나로 합침)"""
+        return self.flights.do(self.flight_key(), self._build)
+
+    def refresh_async(self):
+        """이미 진행 중이 아니면 백그라운드 스레드에서 스냅샷 갱신"""
+        if self.flights.is_in_flight(self.flight_key()):
+            return
+
+        def run():
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.warning(f"시장 데이터 백그라운드 갱신 실패: {e}")
+
+        threading.Thread(target=run, name="market-data-refresh", daemon=True).start()
+
+    def horizons(self) -> list:
+        with self.lock:
+            return list(self.snapshots)
+
+    def oldest_age_seconds(self):
+        """보관 중인 스냅샷 중 가장 오래된 것의 나이 (없으면 None)"""
+        with self.lock:
+            snapshots = list(self.snapshots.values())
+        return max(snap.age_seconds() for snap in snapshots) if snapshots else None
+
+    def run_exclusive(self, fn, *args):
+        """스냅샷 생성과 겹치지 않게 fn 실행 (진행 중인 생성이 있으면 끝날 때까지 대기)"""
+        with self.build_lock:
+            return fn(*args)
+
+    def _build(self) -> dict:
+        snapshots = self.run_exclusive(self.builder)
+        with self.lock:
+            self.snapshots = dict(snapshots)
+        return snapshots
+
+    def invalidate(self, data_period_years: int = None):
+        with self.lock:
+            if data_period_years is None:
+                self.snapshots.clear()
+            else:
+                self.snapshots.pop(data_period_years, None)
+
+    def stats(self) -> dict:
+        """보관 중인 스냅샷별 메모리/생성 시각"""
+        with self.lock:
+            snapshots = dict(self.snapshots)
+        return {
+            years: {'memory_bytes': snap.memory_bytes(), 'age_seconds': snap.age_seconds(),
+                    'tickers': snap.metrics.shape[0]}
+            for years, snap in snapshots.items()
+        }
+
+
+# 시장별 갱신 시각 (현지 시간, 장 마감 후 데이터 반영 여유 포함)
+MARKET_REFRESH_SCHEDULE = {
+    'KR': {'timezone': 'Asia/Seoul', 'refresh_at': '16:00'},        # KRX 15:30 마감
+    'US': {'timezone': 'America/New_York', 'refresh_at': '16:30'},  # NYSE 16:00 마감
+}
+
+
+class CacheRefresher(threading.Thread):
+    """만료 전에 시장 데이터를 미리 갱신하는 백그라운드 데몬
+
+    - 시장별로 장 마감 후 갱신 시각이 지나면 해당 시장 가격을 증분 갱신하고
+      모든 투자 기간 스냅샷(지표/클러스터/무위험 이자율 포함)을 한 번에 다시 만듭니다.
+    - 스냅샷 나이가 만료 시간의 ahead_ratio를 넘으면 만료 전에 미리 다시 만듭니다.
+    갱신 중에도 세션들은 기존 스냅샷을 그대로 사용합니다. 가격 갱신은 스냅샷 생성과 겹치지 않게 실행하고,
+    기다리는 동안 다른 생성이 이미 해당 시장 가격을 받았다면(downloaded_at) 다시 받지 않습니다.
+    """
+
+    def __init__(self, service: MarketDataService, price_refresher, schedule: dict = None,
+                 poll_seconds: float = 300, ahead_ratio: float = 0.8, last_refresh_time: datetime = None,
+                 downloaded_at=None):
+        super().__init__(name="market-data-prewarmer", daemon=True)
+        self.service = service
+        self.price_refresher = price_refresher
+        self.schedule = schedule or MARKET_REFRESH_SCHEDULE
+        self.poll_seconds = poll_seconds
+        self.ahead_ratio = ahead_ratio
+        # 마지막 가격 다운로드 시각이 이미 갱신 시각 이후라면 시작 직후 중복 갱신하지 않음
+        self.last_refresh = {market: last_refresh_time for market in self.schedule} if last_refresh_time else {}
+        self.downloaded_at = downloaded_at  # 시장 -> 그 시장 가격을 마지막으로 받은 시각 (UTC, 없으면 None)
+        self.stop_event = threading.Event()
+
+    def last_scheduled_time(self, market: str, now: datetime = None) -> datetime:
+        """가장 최근에 지난 해당 시장의 갱신 시각 (평일 기준, UTC)"""
+        config = self.schedule[market]
+        tz = ZoneInfo(config['timezone'])
+        hour, minute = map(int, config['refresh_at'].split(':'))
+
+        local_now = (now or datetime.now(timezone.utc)).astimezone(tz)
+        scheduled = local_now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if scheduled > local_now:
+            scheduled -= timedelta(days=1)
+        while scheduled.weekday() >= 5:
+            scheduled -= timedelta(days=1)
+        return scheduled.astimezone(timezone.utc)
+
+    def refreshed_since(self, market: str, due: datetime) -> bool:
+        downloaded = self.downloaded_at(market) if self.downloaded_at else None
+        return any(stamp is not None and stamp >= due for stamp in (self.last_refresh.get(market), downloaded))
+
+    def _refresh_market(self, market: str, due: datetime) -> bool:
+        if self.refreshed_since(market, due):
+            return False
+        self.price_refresher(market)
+        return True
+
+    def tick(self):
+        """갱신이 필요한 시장/스냅샷을 한 번 점검"""
+        now = datetime.now(timezone.utc)
+        markets_refreshed = False
+        for market in self.schedule:
+            due = self.last_scheduled_time(market, now)
+            if self.refreshed_since(market, due):
+                continue
+            try:
+                markets_refreshed |= self.service.run_exclusive(self._refresh_market, market, due)
+                self.last_refresh[market] = now
+            except Exception as e:
+                logging.warning(f"{market} 시장 가격 갱신 실패: {e}")
+
+        ahead_seconds = self.service.max_age_hours * 3600 * self.ahead_ratio
+        age = self.service.oldest_age_seconds()
+        if age is not None and (markets_refreshed or age >= ahead_seconds):
+            try:
+                self.service.refresh()
+            except Exception as e:
+                logging.warning(f"시장 데이터 사전 갱신 실패: {e}")
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.tick()
+            self.stop_event.wait(self.poll_seconds)
+
+    def stop(self):
+        self.stop_event.set()
+
+
+@st.cache_resource
+def get_market_data_service() -> MarketDataService:
+    """프로세스당 하나만 생성되는 시장 데이터 서비스 (백그라운드 갱신 데몬 포함)"""
+    from utils.real_etf_recommender import RealETFRecommender
+
+    builder = RealETFRecommender()
+    service = MarketDataService(builder.build_market_snapshots, builder.all_tickers,
+                                max_age_hours=builder.cache_expiry_hours)
+
+    def downloaded_at(market: str):
+        value = builder.market_download_time(market)
+        return value.astimezone(timezone.utc) if value else None
+
+    service.refresher = CacheRefresher(service, builder.refresh_market_prices, downloaded_at=downloaded_at)
+    service.refresher.start()
+    return service
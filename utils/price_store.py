@@ -0,0 +1,315 @@
+# 티커별 컬럼형 가격 저장소
+# 하나의 거대한 pickle 대신 티커마다 .npy 파일을 두고, manifest로 관리
+
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+SCHEMA_VERSION = 1
+PRICE_DTYPE = np.dtype([('date', 'M8[D]'), ('close', '<f8')])
+
+
+def _atomic_write_bytes(path: Path, write_fn):
+    """임시 파일에 쓴 뒤 교체하여 읽는 쪽이 반쯤 쓰인 파일을 보지 않도록 함"""
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        write_fn(f)
+    os.replace(tmp_path, path)
+
+
+def fill_price_matrix(values: np.ndarray):
+    """(날짜 × 티커) 가격 배열의 결측을 한 번에 보간
+
+    각 열에 대해 pandas의 interpolate(method='linear', limit_direction='both') 후
+    ffill/bfill 한 것과 같은 결과를 열 루프 없이 계산합니다.
+
+    Returns:
+        (보간된 배열, 보간으로 채워진 칸의 bool 마스크)
+    """
+    n_rows, n_cols = values.shape
+    valid = ~np.isnan(values)
+    rows = np.arange(n_rows)[:, None]
+    cols = np.arange(n_cols)[None, :]
+
+    # 각 칸 기준 직전/직후 유효값의 행 위치
+    prev_idx = np.where(valid, rows, -1)
+    np.maximum.accumulate(prev_idx, axis=0, out=prev_idx)
+    next_idx = np.where(valid, rows, n_rows)
+    next_idx = np.minimum.accumulate(next_idx[::-1], axis=0)[::-1]
+
+    has_prev = prev_idx >= 0
+    has_next = next_idx < n_rows
+    prev_val = values[np.clip(prev_idx, 0, n_rows - 1), cols]
+    next_val = values[np.clip(next_idx, 0, n_rows - 1), cols]
+
+    span = np.where(has_prev & has_next & ~valid, next_idx - prev_idx, 1)
+    weight = (rows - prev_idx) / span
+    interpolated = prev_val + (next_val - prev_val) * weight
+
+    filled = np.where(valid, values,
+                      np.where(has_prev & has_next, interpolated,
+                               np.where(has_prev, prev_val, np.where(has_next, next_val, np.nan))))
+    filled_mask = ~valid & ~np.isnan(filled)
+    return filled, filled_mask
+
+
+class PriceStore:
+    """티커별 종가 저장소
+
+    디렉토리 구조:
+        manifest.json   스키마 버전, 티커별 기간/행 수, 메타데이터
+        prices/<티커>.npy  (date, close) 구조체 배열
+        derived/<이름>.npz  가격에서 파생된 상태 (지표 누적 상태 등)
+
+    읽기는 필요한 티커 파일만 메모리 매핑하여 기간을 잘라내므로
+    유니버스 크기와 무관하게 요청한 티커 수에만 비례합니다.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.prices_dir = self.root / "prices"
+        self.manifest_file = self.root / "manifest.json"
+        self.derived_dir = self.root / "derived"
+        self.prices_dir.mkdir(parents=True, exist_ok=True)
+        self.derived_dir.mkdir(exist_ok=True)
+        self.lock = threading.RLock()  # 백그라운드 갱신 스레드와 세션 스레드의 동시 쓰기 보호
+        self.manifest = self._load_manifest()
+
+    # ----- manifest -----
+    def _empty_manifest(self) -> dict:
+        return {'schema_version': SCHEMA_VERSION, 'updated_at': None, 'tickers': {}, 'meta': {}}
+
+    def _load_manifest(self) -> dict:
+        if not self.manifest_file.exists():
+            return self._empty_manifest()
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except Exception:
+            return self._empty_manifest()
+
+        # 스키마가 바뀐 저장소는 읽지 않고 새로 채움
+        if manifest.get('schema_version') != SCHEMA_VERSION:
+            return self._empty_manifest()
+        return manifest
+
+    def _save_manifest(self):
+        self.manifest['updated_at'] = datetime.now().isoformat()
+        payload = json.dumps(self.manifest, ensure_ascii=False, indent=1).encode('utf-8')
+        _atomic_write_bytes(self.manifest_file, lambda f: f.write(payload))
+
+    def reload(self):
+        """다른 세션/프로세스가 갱신한 manifest 다시 읽기"""
+        with self.lock:
+            self.manifest = self._load_manifest()
+
+    # ----- 조회 -----
+    def is_empty(self) -> bool:
+        return not self.manifest['tickers']
+
+    def tickers(self) -> list:
+        return list(self.manifest['tickers'])
+
+    def last_dates(self) -> dict:
+        return {tk: pd.Timestamp(info['end']) for tk, info in self.manifest['tickers'].items()}
+
+    def updated_at(self):
+        """마지막 쓰기 시각 (없으면 None)"""
+        updated_at = self.manifest.get('updated_at')
+        return datetime.fromisoformat(updated_at) if updated_at else None
+
+    def get_meta(self, key: str, default=None):
+        return self.manifest['meta'].get(key, default)
+
+    def set_meta(self, **kwargs):
+        with self.lock:
+            self.manifest['meta'].update(kwargs)
+            self._save_manifest()
+
+    def coverage(self, ticker: str):
+        """티커가 캐시로 덮고 있는 (시작, 끝) 기간 (없으면 None)
+
+        상장일 이후부터만 데이터가 있는 티커도 이미 요청했던 기간은
+        covered_start로 기록되어 같은 구간을 다시 요청하지 않습니다.
+        """
+        info = self.manifest['tickers'].get(ticker)
+        if info is None:
+            return None
+        return pd.Timestamp(info.get('covered_start', info['start'])), pd.Timestamp(info['end'])
+
+    def plan_requests(self, tickers: list, start: str, end: str, refresh_tail: bool, overlap_days: int = 7) -> dict:
+        """요청한 (티커, 기간) 중 캐시가 덮지 못하는 구간만 다운로드 계획 수립
+
+        Args:
+            refresh_tail: 캐시가 만료되어 마지막 날짜 이후를 새로 받아야 하는지 여부
+            overlap_days: 수정 가격 확인을 위해 기존 구간과 겹쳐 받을 일수
+
+        Returns:
+            {'ranges': {티커: (start, end)}, 'modes': {티커: 'full'|'head'|'tail'}, 'hit_ratio': float}
+        """
+        start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+        overlap = pd.Timedelta(days=overlap_days)
+        requested_days = max(1, (end_ts - start_ts).days)
+
+        ranges, modes = {}, {}
+        covered_days = 0
+        for tk in tickers:
+            cov = self.coverage(tk)
+            if cov is None:
+                ranges[tk], modes[tk] = (start, end), 'full'
+                continue
+
+            covered_start, last_date = cov
+            head_missing = covered_start > start_ts
+            tail_missing = refresh_tail and last_date < end_ts
+            if head_missing and tail_missing:
+                ranges[tk], modes[tk] = (start, end), 'full'
+                continue
+
+            hit_start = max(start_ts, covered_start)
+            hit_end = min(end_ts, last_date) if tail_missing else end_ts
+            covered_days += max(0, (hit_end - hit_start).days)
+
+            if head_missing:
+                ranges[tk], modes[tk] = (start, (covered_start + overlap).strftime('%Y-%m-%d')), 'head'
+            elif tail_missing:
+                ranges[tk], modes[tk] = ((last_date - overlap).strftime('%Y-%m-%d'), end), 'tail'
+
+        hit_ratio = covered_days / (requested_days * len(tickers)) if tickers else 1.0
+        return {'ranges': ranges, 'modes': modes, 'hit_ratio': hit_ratio}
+
+    def _ticker_file(self, ticker: str) -> Path:
+        return self.prices_dir / f"{ticker}.npy"
+
+    def read_series(self, ticker: str, start=None, end=None) -> pd.Series:
+        """단일 티커의 [start, end] 구간 종가"""
+        if ticker not in self.manifest['tickers']:
+            return None
+
+        arr = np.load(self._ticker_file(ticker), mmap_mode='r')
+        dates = arr['date']
+        lo = np.searchsorted(dates, np.datetime64(pd.Timestamp(start), 'D'), 'left') if start is not None else 0
+        hi = np.searchsorted(dates, np.datetime64(pd.Timestamp(end), 'D'), 'right') if end is not None else len(arr)
+        chunk = np.array(arr[lo:hi])
+        return pd.Series(chunk['close'], index=pd.DatetimeIndex(chunk['date'].astype('M8[ns]'), name='Date'), name=ticker)
+
+    def read(self, tickers: list = None, start=None, end=None) -> pd.DataFrame:
+        """선택한 티커/기간만 읽어 넓은 형태(날짜 × 티커)로 반환 (결측 보간 포함)"""
+        prices, _ = self.read_aligned(tickers, start, end)
+        return prices
+
+    def read_aligned(self, tickers: list = None, start=None, end=None, fill: bool = True):
+        """선택한 티커를 공용 거래일 달력에 한 번에 정렬
+
+        티커별 배열을 먼저 모두 읽은 뒤 요청 티커들의 거래일 합집합으로 만든
+        달력 위 미리 할당한 2차원 배열에 한 번에 채워 넣고, 보간 정책도 배열 전체에 적용합니다.
+
+        Returns:
+            (가격 DataFrame, 보간으로 채워진 칸의 bool DataFrame)
+        """
+        if tickers is None:
+            tickers = self.tickers()
+        tickers = [tk for tk in tickers if tk in self.manifest['tickers']]
+        if not tickers:
+            return pd.DataFrame(), pd.DataFrame()
+
+        lo_date = np.datetime64(pd.Timestamp(start), 'D') if start is not None else None
+        hi_date = np.datetime64(pd.Timestamp(end), 'D') if end is not None else None
+        chunks = []
+        for tk in tickers:
+            arr = np.load(self._ticker_file(tk), mmap_mode='r')
+            lo = np.searchsorted(arr['date'], lo_date, 'left') if lo_date is not None else 0
+            hi = np.searchsorted(arr['date'], hi_date, 'right') if hi_date is not None else len(arr)
+            chunks.append(np.array(arr[lo:hi]))
+
+        # 요청 티커 거래일의 합집합 = 공용 달력
+        calendar = np.unique(np.concatenate([chunk['date'] for chunk in chunks]))
+        values = np.full((len(calendar), len(tickers)), np.nan)
+        for j, chunk in enumerate(chunks):
+            values[np.searchsorted(calendar, chunk['date']), j] = chunk['close']
+
+        if fill:
+            values, filled_mask = fill_price_matrix(values)
+        else:
+            filled_mask = np.zeros(values.shape, dtype=bool)
+
+        index = pd.DatetimeIndex(calendar.astype('M8[ns]'), name='Date')
+        return (pd.DataFrame(values, index=index, columns=tickers),
+                pd.DataFrame(filled_mask, index=index, columns=tickers))
+
+    # ----- 쓰기 -----
+    def write_series(self, ticker: str, series: pd.Series, covered_start=None, save_manifest: bool = True):
+        """티커 하나를 (다른 티커 파일은 건드리지 않고) 저장
+
+        Args:
+            covered_start: 이 티커에 대해 요청했던 가장 이른 시작일 (상장일 이전 구간 재요청 방지)
+        """
+        series = series.dropna()
+        series = series[~series.index.duplicated(keep='last')].sort_index()
+        if series.empty:
+            return
+
+        with self.lock:
+            arr = np.empty(len(series), dtype=PRICE_DTYPE)
+            arr['date'] = series.index.values.astype('M8[D]')
+            arr['close'] = series.to_numpy(dtype=float)
+            _atomic_write_bytes(self._ticker_file(ticker), lambda f: np.save(f, arr))
+
+            first_date = pd.Timestamp(arr['date'][0])
+            previous = self.manifest['tickers'].get(ticker, {})
+            covered = [first_date]
+            if covered_start is not None:
+                covered.append(pd.Timestamp(covered_start))
+            # 이력이 교체(수정 가격 재다운로드)되지 않고 확장된 경우에만 기존 범위 유지
+            if 'covered_start' in previous and first_date <= pd.Timestamp(previous['start']):
+                covered.append(pd.Timestamp(previous['covered_start']))
+
+            self.manifest['tickers'][ticker] = {
+                'start': str(arr['date'][0]),
+                'covered_start': min(covered).strftime('%Y-%m-%d'),
+                'end': str(arr['date'][-1]),
+                'rows': int(len(arr)),
+                'written_at': datetime.now().isoformat()
+            }
+            if save_manifest:
+                self._save_manifest()
+
+    def write_many(self, series_map: dict, covered_start=None, **meta):
+        """여러 티커 저장 후 manifest를 한 번만 기록"""
+        with self.lock:
+            for tk, series in series_map.items():
+                self.write_series(tk, series, covered_start=covered_start, save_manifest=False)
+            self.manifest['meta'].update(meta)
+            self._save_manifest()
+
+    def import_frame(self, price_data: pd.DataFrame, **meta):
+        """기존 넓은 형태 DataFrame(구 pickle 캐시)을 저장소로 이전"""
+        self.write_many({tk: price_data[tk] for tk in price_data.columns}, **meta)
+
+    # ----- 파생 상태 -----
+    def save_arrays(self, name: str, arrays: dict, **meta):
+        """가격에서 파생된 배열 묶음을 저장소 옆에 저장 (meta는 JSON으로 함께 기록)"""
+        payload = dict(arrays)
+        payload['__meta__'] = np.array(json.dumps({'schema_version': SCHEMA_VERSION, **meta}, ensure_ascii=False))
+        with self.lock:
+            _atomic_write_bytes(self.derived_dir / f"{name}.npz", lambda f: np.savez(f, **payload))
+
+    def load_arrays(self, name: str):
+        """save_arrays로 저장한 (배열 dict, meta) - 없거나 스키마가 다르면 None"""
+        path = self.derived_dir / f"{name}.npz"
+        if not path.exists():
+            return None
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                meta = json.loads(str(data['__meta__']))
+                arrays = {key: data[key] for key in data.files if key != '__meta__'}
+        except Exception:
+            return None
+        if meta.pop('schema_version', None) != SCHEMA_VERSION:
+            return None
+        return arrays, meta
@@ -7,18 +7,36 @@ from plotly.subplots import make_subplots
 from sklearn.preprocessing import RobustScaler, minmax_scale
 from sklearn.cluster import KMeans, DBSCAN
 import umap.umap_ as umap
-from sklearn.metrics import silhouette_score
+from umap import __version__ as umap_version
+from sklearn import __version__ as sklearn_version
 from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
 from dateutil.relativedelta import relativedelta
 import logging
+import hashlib
 from tqdm import tqdm
 import warnings
-from kneed import KneeLocator
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pickle
 import os
 from pathlib import Path
+from utils.data_fetcher import CircuitBreaker, ConcurrentFetcher, NegativeCache, get_market, merge_price_history
+from utils.price_store import PriceStore
+from utils.return_index import ReturnIndex
+from utils.rolling_metrics import RollingMetrics
+from utils.correlation import CorrelationMatrix
+from utils.umap_search import ann_graph, sampled_silhouette, search_umap_grid, umap_grid
+from utils.k_selection import elbow_search, kmeans_sweep, score_sweep, select_k
+from utils.clustering_cache import ClusteringCache
+from utils.cluster_model import ClusterModel
+from utils.bootstrap import BOOTSTRAP_COLUMNS, bootstrap_intervals
+from utils.benchmark_metrics import BENCHMARK_COLUMNS, MARKET_BENCHMARKS, benchmark_relative_metrics
+from utils.risk_metrics import METRIC_COLUMNS, TAIL_COLUMNS, MetricAccumulator, compute_risk_metrics, tail_risk_metrics
+from utils.market_data import MarketSnapshot, get_market_data_service
+
+# 기간별 지표 저장본(horizon_metrics)에 들어가는 수치 열
+STORED_METRIC_COLUMNS = METRIC_COLUMNS + BENCHMARK_COLUMNS + TAIL_COLUMNS
 
 # 경고 메시지 숨기기
 warnings.filterwarnings('ignore')
@@ -44,13 +62,50 @@ class RealETFRecommender:
         self.scaler = RobustScaler()
         self.is_data_loaded = False
         self.returns_df = None
+        self.return_index = None  # 임의 기간 수익률/변동성/CAGR 조회용 누적합 인덱스
+        self.rolling_metrics = None  # 롤링 변동성/샤프/낙폭/베타/상관계수 계산기
+        self.correlation = None  # 유니버스 전체 상관/공분산 행렬 (CorrelationMatrix)
+        self.covariance_shrinkage = False  # True면 공분산에 Ledoit-Wolf 축소 적용
+        self.metric_intervals = None  # 주요 지표 부트스트랩 신뢰구간 (티커 x BOOTSTRAP_COLUMNS)
+        self.bootstrap_config = {'n_replicates': 500, 'block_length': 21, 'confidence': 0.9, 'seed': 42}
+        self.bootstrap_workers = 1  # 2 이상이면 프로세스 풀에서 티커를 나눠 계산
+        self.clustering_workers = 1  # 2 이상이면 UMAP 격자 조합을 프로세스 풀에서 나눠 평가 (풀은 프로세스가 끝날 때까지 유지)
+        self.umap_early_stop_score = None  # 이 실루엣 점수 이상인 조합이 나오면 나머지 조합 평가 생략
+        self.large_universe_threshold = 1000  # ETF가 이 수 이상이면 대규모 모드 (근사 이웃, MiniBatchKMeans, 표본 실루엣)
+        self.large_universe_options = {'n_epochs': 200, 'silhouette_sample': 2000}
+        self.k_criterion = 'elbow'  # 최적 k 기준 ('elbow', 'silhouette', 'calinski_harabasz')
         self.metrics_df = None
+        self.data_as_of = None  # 공유 스냅샷 생성 시각
+        self.horizon_years = [1, 3, 5, 10]  # 데이터 갱신마다 지표/클러스터를 미리 만들어 두는 투자 기간
         
         # 캐시 디렉토리 설정
         self.cache_dir = Path("cache")
         self.cache_dir.mkdir(exist_ok=True)
-        self.cache_file = self.cache_dir / "etf_data_cache.pkl"
+        self.legacy_cache_file = self.cache_dir / "etf_data_cache.pkl"
+        self.price_store = PriceStore(self.cache_dir / "price_store")
+        self.clustering_cache = ClusteringCache(self.cache_dir / "clustering")  # 입력 해시 기준 클러스터링 결과
+        self.model_dir = self.cache_dir / "models"  # 기간별 클러스터 모델 (스케일러/UMAP/KMeans)
+        self.cluster_refit_days = 30  # 이 기간이 지나면 클러스터 모델 전체 재학습
+        self.cluster_drift_threshold = 0.25  # 기존 ETF 지표 이동량(학습 당시 분포 대비)이 이 값을 넘으면 재학습
+        self.cluster_new_ratio_threshold = 0.2  # 학습에 없던 ETF 비율이 이 값을 넘으면 재학습
+        self.last_cluster_update = None  # 직전 라벨 산출 방식 (incremental/refit)과 사유
+        self.migrate_legacy_cache()
         self.cache_expiry_hours = 6  # 6시간마다 캐시 갱신
+        self.refresh_overlap_days = 7  # 증분 갱신 시 수정 가격 확인용 겹침 구간 (일)
+        self.last_metric_update = None  # 직전 지표 계산 방식 (incremental/full)과 반영한 거래일 수
+        
+        # 무위험 이자율 저장소 (가격과 같은 형식, 소스별 원시 시계열 보관)
+        self.rate_store = PriceStore(self.cache_dir / "rate_store")
+        self.rate_expiry_hours = 24
+        self.risk_free_sources = [('TB3MS', 'FRED:TB3MS', 'TB3MS'), ('KOFR', 'KOFR', 'Close'), ('CD91', 'CD91', 'Close')]
+        
+        # 병렬 다운로드 설정 (시장별 초당 요청 수 제한)
+        self.fetch_workers = 8
+        self.fetch_rate_limits = {'KR': 4.0, 'US': 8.0}
+        
+        # 반복 실패 티커는 일정 기간 건너뛰고, 소스 전체 장애 시 시장 단위로 요청 차단
+        self.negative_cache = NegativeCache(self.cache_dir / "negative_cache.json")
+        self.circuit_breakers = {'KR': CircuitBreaker(), 'US': CircuitBreaker()}
         
         # 확장된 한국 ETF 목록 (기존 30개 → 48개)
         self.kr_etfs = [
@@ -87,6 +142,7 @@ class RealETFRecommender:
         ]))
         
         self.all_tickers = sorted(list(set(self.kr_etfs + self.us_etfs)))
+        self.markets = sorted({get_market(tk) for tk in self.all_tickers})
         
         # 확장된 ETF 테마 매핑
         self.etf_theme_map = {
@@ -152,248 +208,403 @@ class RealETFRecommender:
         
         self.user_theme_code_to_name_map = {2: '기술', 3: '에너지', 4: '헬스케어'}
     
-    def is_cache_valid(self) -> bool:
-        """캐시 파일이 유효한지 확인"""
-        if not self.cache_file.exists():
+    def market_download_time(self, market: str):
+        """해당 시장 가격을 마지막으로 최신 구간까지 받은 시각 (시장별 기록이 없는 이전 저장소는 전체 다운로드 시각)"""
+        times = self.price_store.get_meta('market_download_times') or {}
+        download_time = times.get(market) or self.price_store.get_meta('download_time')
+        return datetime.fromisoformat(download_time) if download_time else None
+    
+    def is_cache_valid(self, markets: list = None) -> bool:
+        """캐시 저장소가 유효한지 확인 (markets의 모든 시장이 만료 전인지, 없으면 전체 시장)"""
+        if self.price_store.is_empty():
             return False
         
-        # 파일 수정 시간 확인
-        cache_time = datetime.fromtimestamp(self.cache_file.stat().st_mtime)
+        # 시장별 마지막 다운로드 시간 확인 (한 시장만 갱신했다고 다른 시장까지 유효해지지 않음)
         current_time = datetime.now()
-        time_diff = current_time - cache_time
-        
-        return time_diff.total_seconds() < (self.cache_expiry_hours * 3600)
+        for market in markets or self.markets:
+            cache_time = self.market_download_time(market)
+            if cache_time is None or (current_time - cache_time).total_seconds() >= self.cache_expiry_hours * 3600:
+                return False
+        return True
+    
+    def migrate_legacy_cache(self):
+        """구 pickle 캐시(etf_data_cache.pkl)를 티커별 저장소로 1회 이전"""
+        if not self.price_store.is_empty() or not self.legacy_cache_file.exists():
+            return
+        try:
+            with open(self.legacy_cache_file, 'rb') as f:
+                data = pickle.load(f)
+            self.price_store.import_frame(
+                data['price_data'],
+                download_time=data.get('download_time'),
+                failed_tickers=data.get('failed_tickers', [])
+            )
+        except Exception as e:
+            st.warning(f"기존 캐시 이전 실패: {e}")
     
-    def save_cache(self, data: dict):
-        """데이터를 캐시 파일에 저장"""
+    def save_cache(self, series_map: dict, failed_tickers: list, covered_start: str = None, refreshed: bool = True,
+                   markets: list = None, quiet: bool = False):
+        """갱신된 티커만 캐시 저장소에 저장 (다른 티커 파일은 다시 쓰지 않음)
+        
+        markets: 최신 구간까지 갱신한 시장 (없으면 전체). 전체 다운로드 시각은 모든 시장을 갱신했을 때만 바꿉니다.
+        """
         try:
-            with open(self.cache_file, 'wb') as f:
-                pickle.dump(data, f)
-            st.success(f"✅ 데이터 캐시 저장 완료 ({len(data.get('tickers', []))}개 ETF)")
+            meta = {'failed_tickers': failed_tickers}
+            if refreshed:
+                now = datetime.now().isoformat()
+                markets = self.markets if markets is None else markets
+                market_times = dict(self.price_store.get_meta('market_download_times') or {})
+                market_times.update({market: now for market in markets})
+                meta['market_download_times'] = market_times
+                if set(markets) >= set(self.markets):
+                    meta['download_time'] = now
+            self.price_store.write_many(series_map, covered_start=covered_start, **meta)
+            self._message('success', f"✅ 데이터 캐시 저장 완료 ({len(series_map)}개 ETF 갱신)", quiet)
         except Exception as e:
-            st.warning(f"캐시 저장 실패: {e}")
+            self._message('warning', f"캐시 저장 실패: {e}", quiet)
+    
+    def _message(self, level: str, text: str, quiet: bool = False):
+        """Streamlit 알림 (화면이 없는 백그라운드 스레드에서는 로그로 남김)"""
+        if quiet:
+            logging.info(text)
+        else:
+            getattr(st, level)(text)
     
-    def load_cache(self) -> dict:
-        """캐시 파일에서 데이터 로드"""
+    def load_cache(self, tickers: list = None, start: str = None, end: str = None, quiet: bool = False) -> dict:
+        """캐시 저장소에서 요청한 티커/기간만 로드"""
         try:
-            with open(self.cache_file, 'rb') as f:
-                data = pickle.load(f)
-            st.info(f"📦 캐시된 데이터 로드 ({len(data.get('tickers', []))}개 ETF)")
+            self.price_store.reload()
+            price_data, filled_mask = self.price_store.read_aligned(tickers, start, end)
+            data = {
+                'price_data': price_data,
+                'filled_mask': filled_mask,
+                'tickers': self.price_store.tickers(),
+                'last_dates': self.price_store.last_dates(),
+                'download_time': self.price_store.get_meta('download_time'),
+                'failed_tickers': self.price_store.get_meta('failed_tickers', [])
+            }
+            self._message('info', f"📦 캐시된 데이터 로드 ({data['price_data'].shape[1]}개 ETF)", quiet)
             return data
         except Exception as e:
-            st.warning(f"캐시 로드 실패: {e}")
+            self._message('warning', f"캐시 로드 실패: {e}", quiet)
             return None
     
-    def fetch_risk_free_rate(self, start_date_str: str, end_date_str: str) -> float:
-        """무위험 이자율 가져오기 (v3 구현)"""
-        if not FDR_AVAILABLE:
-            return 0.03
-            
-        try:
-            data = fdr.DataReader('FRED:TB3MS', start_date_str, end_date_str)
-            if not data.empty:
-                monthly_rate = data['TB3MS'].resample('M').last().mean()
-                if pd.notna(monthly_rate):
-                    return monthly_rate / 100
-        except Exception:
-            for ticker in ['KOFR', 'CD91']:
+    def get_fetch_skip_report(self) -> pd.DataFrame:
+        """건너뛰고 있는 티커/데이터 소스와 그 사유"""
+        report = pd.DataFrame(self.negative_cache.report(),
+                              columns=['ticker', 'market', 'failures', 'last_error', 'last_failed', 'skip_until', 'skipping'])
+        report['circuit_state'] = report['market'].map(lambda market: self.circuit_breakers[market].state)
+        return report
+    
+    def is_rate_cache_valid(self) -> bool:
+        """무위험 이자율 저장소를 마지막으로 확인한 지 rate_expiry_hours 이내인지"""
+        checked_time = self.rate_store.get_meta('checked_time')
+        if not checked_time:
+            return False
+        return (datetime.now() - datetime.fromisoformat(checked_time)).total_seconds() < self.rate_expiry_hours * 3600
+    
+    def load_risk_free_rates(self, start_date_str: str, end_date_str: str):
+        """무위험 이자율 원시 시계열 (로컬 저장소 우선, 부족한 구간만 증분 다운로드)
+        
+        Returns:
+            (소스 이름, 퍼센트 단위 시계열) - 가져올 수 없으면 (None, None)
+        """
+        # 월별 지표(TB3MS)도 기간 시작일에 값이 있도록 조금 앞에서부터 조회
+        lookback_start = (pd.Timestamp(start_date_str) - pd.Timedelta(days=45)).strftime('%Y-%m-%d')
+        
+        self.rate_store.reload()
+        refresh_tail = not self.is_rate_cache_valid()
+        checked = False
+        
+        for name, symbol, column in self.risk_free_sources:
+            plan = self.rate_store.plan_requests([name], lookback_start, end_date_str,
+                                                 refresh_tail=refresh_tail, overlap_days=45)
+            if name in plan['ranges'] and FDR_AVAILABLE:
+                checked = True
                 try:
-                    data = fdr.DataReader(ticker, start_date_str, end_date_str)
-                    if not data.empty and 'Close' in data.columns:
-                        return data['Close'].mean() / 100
+                    data = fdr.DataReader(symbol, *plan['ranges'][name])
+                    if data is not None and not data.empty and column in data.columns:
+                        new_rates = data[column].replace([np.inf, -np.inf], np.nan).dropna()
+                        old_rates = self.rate_store.read_series(name)
+                        if old_rates is not None and plan['modes'][name] != 'full':
+                            new_rates = pd.concat([old_rates[~old_rates.index.isin(new_rates.index)], new_rates]).sort_index()
+                        self.rate_store.write_series(name, new_rates, covered_start=lookback_start)
                 except Exception:
-                    continue
-        return 0.03
+                    pass
+            
+            rates = self.rate_store.read_series(name, lookback_start, end_date_str)
+            if rates is not None and not rates.empty:
+                break
+        else:
+            name, rates = None, None
+        
+        if checked:
+            self.rate_store.set_meta(checked_time=datetime.now().isoformat())
+        return name, rates
+    
+    def fetch_risk_free_rate(self, start_date_str: str, end_date_str: str) -> float:
+        """기간 평균 무위험 이자율 (로컬 저장소 기반)"""
+        source, rates = self.load_risk_free_rates(start_date_str, end_date_str)
+        if rates is None:
+            return 0.03
+        
+        window_rates = rates.loc[start_date_str:end_date_str]
+        if window_rates.empty:
+            window_rates = rates.iloc[-1:]
+        mean_rate = window_rates.mean()
+        return mean_rate / 100 if pd.notna(mean_rate) else 0.03
+    
+    def get_risk_free_series(self, start_date_str: str, end_date_str: str, index: pd.DatetimeIndex = None) -> pd.Series:
+        """일별 무위험 이자율 시계열 (연율, 소수 단위)
+        
+        월별 지표는 다음 발표일까지 이전 값을 유지하며, index를 주면 해당 거래일에 맞춰 반환합니다.
+        """
+        if index is None:
+            index = pd.bdate_range(start_date_str, end_date_str)
+        
+        source, rates = self.load_risk_free_rates(start_date_str, end_date_str)
+        if rates is None:
+            return pd.Series(0.03, index=index)
+        
+        daily = rates.reindex(rates.index.union(index)).ffill().bfill().reindex(index)
+        return daily / 100
     
-    def fetch_etf_data_with_retry(self, tickers: list, start: str, end: str, max_retries: int = 3):
-        """ETF 데이터 가져오기 (캐시 기능 포함)"""
+    def fetch_etf_data_with_retry(self, tickers: list, start: str, end: str, max_retries: int = 3, refresh_tail: bool = None,
+                                  progress_callback=None):
+        """ETF 데이터 가져오기 (기간 인식 캐시 + 부족한 티커/구간만 다운로드)
+        
+        refresh_tail이 None이면 요청 티커 시장의 캐시 만료 여부로 최신 구간 갱신을 결정합니다.
+        같은 인스턴스를 백그라운드 갱신과 공유하므로 요청별 결과는 인스턴스에 저장하지 않고 반환합니다.
+        progress_callback(done, total, ticker)을 주면 Streamlit 진행 표시/알림 대신 그 함수와 로그를 씁니다
+        (화면이 없는 백그라운드 스레드용).
+        
+        Returns:
+            (가격 DataFrame, 성공한 티커 목록, {'filled_mask': 보간으로 채워진 칸, 'cache_hit_ratio': 캐시 적중률})
+        """
         if not FDR_AVAILABLE:
             st.error("FinanceDataReader가 설치되지 않았습니다.")
-            return pd.DataFrame(), []
-        
-        # 캐시 확인
-        if self.is_cache_valid():
-            cached_data = self.load_cache()
-            if cached_data and 'price_data' in cached_data and 'tickers' in cached_data:
-                # 요청된 티커가 캐시에 모두 있는지 확인
-                cached_tickers = set(cached_data['tickers'])
-                requested_tickers = set(tickers)
+            return pd.DataFrame(), [], {}
+        
+        # 캐시 확인: (티커, 기간) 단위로 캐시가 덮는 부분과 부족한 구간 계산
+        quiet = progress_callback is not None
+        markets = sorted({get_market(tk) for tk in tickers})
+        self.price_store.reload()
+        if refresh_tail is None:
+            refresh_tail = not self.is_cache_valid(markets)
+        plan = self.price_store.plan_requests(tickers, start, end, refresh_tail=refresh_tail,
+                                              overlap_days=self.refresh_overlap_days)
+        ranges, modes = plan['ranges'], plan['modes']
+        cache_hit_ratio = plan['hit_ratio']
+        
+        if ranges:
+            mode_counts = {mode: list(modes.values()).count(mode) for mode in ('full', 'head', 'tail')}
+            self._message('info', f"📡 부족한 데이터만 다운로드 중... (전체 {mode_counts['full']}개, "
+                                  f"과거 구간 {mode_counts['head']}개, 최신 구간 {mode_counts['tail']}개 / "
+                                  f"캐시 적중률 {cache_hit_ratio:.0%})", quiet)
+            
+            if quiet:
+                on_progress, progress_bar, status_text = progress_callback, None, None
+            else:
+                progress_bar = st.progress(0)
+                status_text = st.empty()
                 
-                if requested_tickers.issubset(cached_tickers):
-                    # 캐시된 데이터에서 필요한 티커만 추출
-                    price_data = cached_data['price_data']
-                    available_tickers = [t for t in tickers if t in price_data.columns]
-                    filtered_data = price_data[available_tickers]
-                    
-                    st.success(f"🚀 캐시에서 데이터 로드 완료! ({len(available_tickers)}개 ETF)")
-                    return filtered_data, available_tickers
-        
-        # 캐시가 없거나 유효하지 않은 경우 새로 다운로드
-        st.info("📡 실시간 데이터 다운로드 중...")
-            
-        data = pd.DataFrame()
-        successful_tickers = []
-        failed_tickers = []
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        for i, tk in enumerate(tickers):
-            progress_bar.progress((i + 1) / len(tickers))
-            status_text.text(f"ETF 데이터 가져오는 중: {tk} ({i+1}/{len(tickers)})")
-            
-            for attempt in range(1, max_retries + 1):
-                try:
-                    df_raw = fdr.DataReader(tk, start, end)
-                    if df_raw is None or df_raw.empty:
-                        if attempt == max_retries: 
-                            failed_tickers.append(tk)
-                        continue
-                        
-                    close_col = 'Adj Close' if 'Adj Close' in df_raw.columns else 'Close'
-                    if close_col not in df_raw.columns:
-                        if attempt == max_retries: 
-                            failed_tickers.append(tk)
-                        continue
-                        
-                    series = df_raw[close_col].copy()
-                    series.replace([np.inf, -np.inf], np.nan, inplace=True)
-                    
-                    if series.notna().sum() < 2:
-                        if attempt == max_retries: 
-                            failed_tickers.append(tk)
-                        continue
-                        
-                    series.interpolate(method='linear', limit_direction='both', inplace=True)
-                    series.ffill(inplace=True)
-                    series.bfill(inplace=True)
-                    
-                    if series.isnull().all():
-                        if attempt == max_retries: 
-                            failed_tickers.append(tk)
-                        continue
-                        
-                    series = series[~series.index.duplicated(keep='first')]
-                    data[tk] = series
-                    successful_tickers.append(tk)
-                    break
-                    
-                except Exception as e:
-                    if attempt == max_retries: 
-                        failed_tickers.append(tk)
-        
-        progress_bar.empty()
-        status_text.empty()
-        
-        if not data.empty:
-            data = data.dropna(how='all', axis=1)
-            
-            # 새로 다운로드한 데이터를 캐시에 저장
-            cache_data = {
-                'price_data': data,
-                'tickers': successful_tickers,
-                'download_time': datetime.now().isoformat(),
-                'failed_tickers': failed_tickers
-            }
-            self.save_cache(cache_data)
+                def on_progress(done, total, tk):
+                    progress_bar.progress(done / total)
+                    status_text.text(f"ETF 데이터 가져오는 중: {tk} ({done}/{total})")
+            
+            fetcher = ConcurrentFetcher(
+                fdr.DataReader,
+                max_workers=self.fetch_workers,
+                rate_limits=self.fetch_rate_limits,
+                max_retries=max_retries,
+                negative_cache=self.negative_cache,
+                circuit_breakers=self.circuit_breakers
+            )
+            series_map, failed = fetcher.fetch_ranges(ranges, progress_callback=on_progress, modes=modes)
+            skipped = dict(fetcher.skipped)
+            
+            # 캐시된 이력과 병합 (겹침 구간 가격이 바뀐 티커는 전체 재다운로드)
+            restated_tickers = []
+            for tk in list(series_map):
+                if modes[tk] == 'full':
+                    continue
+                merged, restated = merge_price_history(self.price_store.read_series(tk), series_map[tk])
+                if restated:
+                    restated_tickers.append(tk)
+                    del series_map[tk]
+                else:
+                    series_map[tk] = merged
+            
+            # 부분 구간 실패는 기존 이력을 그대로 사용 (신규 거래일이 없는 경우 포함)
+            failed_tickers = [tk for tk in failed if modes[tk] == 'full']
+            
+            if restated_tickers:
+                if status_text is not None:
+                    status_text.text(f"수정 가격 감지: {len(restated_tickers)}개 ETF 전체 이력 재다운로드")
+                # 저장 파일을 통째로 교체하므로 요청 기간이 아니라 저장된 이력 전체를 다시 받음
+                refetch_ranges = {}
+                for tk in restated_tickers:
+                    covered = self.price_store.coverage(tk)
+                    refetch_start = min(pd.Timestamp(start), covered[0]) if covered else pd.Timestamp(start)
+                    refetch_ranges[tk] = (refetch_start.strftime('%Y-%m-%d'), end)
+                refetched, refetch_failed = fetcher.fetch_ranges(refetch_ranges, progress_callback=on_progress)
+                series_map.update(refetched)
+                failed_tickers.extend(refetch_failed)
+                skipped.update(fetcher.skipped)
+            
+            if not quiet:
+                progress_bar.empty()
+                status_text.empty()
             
-        return data, successful_tickers
+            if skipped:
+                self._message('info', f"⏭️ 최근 실패가 반복된 {len(skipped)}개 ETF는 건너뛰었습니다: "
+                                      f"{', '.join(sorted(skipped))}", quiet)
+            
+            if series_map:
+                # 새로 받거나 갱신된 티커만 캐시 저장소에 기록
+                self.save_cache(series_map, failed_tickers, covered_start=start, refreshed=refresh_tail,
+                                markets=markets, quiet=quiet)
+        
+        # 캐시에 있던 부분과 새로 받은 부분을 요청 기간으로 이어 붙여 반환
+        cached_data = self.load_cache(tickers, start, end, quiet=quiet)
+        if not cached_data:
+            return pd.DataFrame(), [], {}
+        
+        data = cached_data['price_data'].dropna(how='all', axis=1)
+        successful_tickers = [tk for tk in tickers if tk in data.columns]
+        details = {'filled_mask': cached_data['filled_mask'][successful_tickers], 'cache_hit_ratio': cache_hit_ratio}
+        
+        self._message('success', f"🚀 데이터 준비 완료! ({len(successful_tickers)}개 ETF, 캐시 적중률 {cache_hit_ratio:.0%})",
+                      quiet)
+        return data[successful_tickers], successful_tickers, details
     
-    def calculate_risk_metrics(self, returns: pd.DataFrame, risk_free_rate: float = 0.0) -> pd.DataFrame:
-        """위험 지표 계산 (v3 구현)"""
-        metrics = pd.DataFrame(index=returns.columns)
-        annual_factor = 252
+    def _risk_free_inputs(self, returns: pd.DataFrame, risk_free_rate, annual_factor: int = 252):
+        """무위험 이자율 입력을 (일별 기준 이자율, 기간 평균 연율, 거래일별 연율 배열)로 정리"""
+        # 시계열이면 거래일별 이자율로 하방 위험/오메가를, 기간 평균으로 초과수익을 계산
+        if isinstance(risk_free_rate, pd.Series):
+            rf_annual = risk_free_rate.reindex(returns.index).ffill().bfill().fillna(0.0).to_numpy(dtype=float)
+            return rf_annual / annual_factor, float(rf_annual.mean()) if len(rf_annual) else 0.0, rf_annual
+        return risk_free_rate / annual_factor, risk_free_rate, np.full(len(returns), float(risk_free_rate))
+    
+    def _transaction_costs(self, tickers) -> np.ndarray:
         transaction_cost = {'KR': 0.0015, 'US': 0.0030}
-        market_map = {tk: 'KR' if tk.isdigit() and len(tk) == 6 else 'US' for tk in returns.columns}
-        
-        annual_return = returns.mean() * annual_factor
-        costs = annual_return.index.map(lambda tk: transaction_cost[market_map[tk]])
-        metrics['Annual Return'] = annual_return - costs
-        metrics['Annual Volatility'] = returns.std() * np.sqrt(annual_factor)
-        metrics['Sharpe Ratio'] = np.where(metrics['Annual Volatility'] > 1e-6,
-                                           (metrics['Annual Return'] - risk_free_rate) / metrics['Annual Volatility'], 0)
-        
-        cumulative_returns = (1 + returns).cumprod()
-        peak = cumulative_returns.cummax()
-        drawdown = (cumulative_returns - peak) / peak
-        metrics['Max Drawdown'] = drawdown.min()
-        metrics['Ulcer Index'] = np.sqrt((drawdown**2).mean())
-        
-        downside_returns = returns[returns < risk_free_rate/annual_factor].fillna(0)
-        metrics['Downside Risk'] = downside_returns.std() * np.sqrt(annual_factor)
-        metrics['Sortino Ratio'] = np.where(metrics['Downside Risk'] > 1e-6,
-                                            (metrics['Annual Return'] - risk_free_rate) / metrics['Downside Risk'], 0)
-        
-        daily_risk_free_rate = risk_free_rate / annual_factor
-        gain = (returns - daily_risk_free_rate).clip(lower=0).mean()
-        loss = (daily_risk_free_rate - returns).clip(lower=0).mean()
-        metrics['Omega Ratio'] = np.where(loss > 1e-9, gain / loss, 0)
-        
-        metrics['Calmar Ratio'] = np.where(np.abs(metrics['Max Drawdown']) > 1e-6,
-                                           metrics['Annual Return'] / (-metrics['Max Drawdown']), 0)
-        
-        metrics['Skewness'] = returns.skew()
-        metrics['Kurtosis'] = returns.kurt()
-        
-        if len(returns) >= annual_factor:
-            metrics['Recent Return'] = returns.iloc[-annual_factor:].mean() * annual_factor
-            metrics['Recent Volatility'] = returns.iloc[-annual_factor:].std() * np.sqrt(annual_factor)
+        return np.array([transaction_cost[get_market(tk)] for tk in tickers], dtype=float)
+    
+    def calculate_risk_metrics(self, returns: pd.DataFrame, risk_free_rate=0.0) -> pd.DataFrame:
+        """위험 지표 계산 (v3 구현)
+        
+        risk_free_rate는 상수(연율) 또는 일별 무위험 이자율 시계열(연율)을 받습니다.
+        """
+        annual_factor = 252
+        daily_risk_free_rate, risk_free_rate, _ = self._risk_free_inputs(returns, risk_free_rate, annual_factor)
+        
+        # 모든 지표를 하나의 2차원 배열 위에서 한 번에 계산 (utils/risk_metrics.py)
+        values = compute_risk_metrics(returns.to_numpy(dtype=float), daily_risk_free_rate, risk_free_rate,
+                                      self._transaction_costs(returns.columns), annual_factor=annual_factor)
+        return pd.DataFrame(values, index=returns.columns, columns=METRIC_COLUMNS)
+    
+    def update_risk_metrics(self, state_name: str, returns: pd.DataFrame, risk_free_rate=0.0) -> pd.DataFrame:
+        """저장된 지표 누적 상태에 새 거래일만 반영하여 위험 지표 계산
+        
+        시작일/티커가 같고 기존 구간 데이터가 바뀌지 않았다면 새 거래일 수만큼만 갱신하고,
+        그렇지 않으면 전체를 다시 계산해 상태를 새로 저장합니다. 결과는 calculate_risk_metrics와 같습니다.
+        """
+        daily_risk_free_rate, _, rf_annual = self._risk_free_inputs(returns, risk_free_rate)
+        
+        loaded = self.price_store.load_arrays(state_name)
+        accumulator = MetricAccumulator.from_arrays(*loaded) if loaded else None
+        if accumulator is not None and accumulator.can_extend(returns, rf_annual):
+            self.last_metric_update = {'mode': 'incremental', 'new_rows': len(returns) - accumulator.rows}
+            accumulator.extend(returns, daily_risk_free_rate, rf_annual)
         else:
-            metrics[['Recent Return', 'Recent Volatility']] = np.nan
-            
-        return metrics.fillna(0).replace([np.inf, -np.inf], 0)
+            self.last_metric_update = {'mode': 'full', 'new_rows': len(returns)}
+            accumulator = MetricAccumulator.from_returns(returns, daily_risk_free_rate, rf_annual)
+        
+        arrays, meta = accumulator.to_arrays()
+        self.price_store.save_arrays(state_name, arrays, **meta)
+        values = accumulator.metrics(self._transaction_costs(returns.columns))
+        return pd.DataFrame(values, index=returns.columns, columns=METRIC_COLUMNS)
     
-    def optimize_clustering(self, data: pd.DataFrame, k_range=range(2, 11), random_state=42):
-        """클러스터링 최적화 (v3 구현)"""
+    def calculate_tail_risk(self, returns: pd.DataFrame) -> pd.DataFrame:
+        """95%/99% 역사적 VaR/CVaR와 Cornish-Fisher VaR (일별 수익률 기준, 손실은 음수)"""
+        values = tail_risk_metrics(returns.to_numpy(dtype=float))
+        return pd.DataFrame(values, index=returns.columns, columns=TAIL_COLUMNS)
+    
+    def calculate_benchmark_metrics(self, returns: pd.DataFrame, risk_free_rate=0.0, benchmarks: dict = None) -> pd.DataFrame:
+        """시장별 벤치마크 대비 베타/알파/추적오차/정보비율/포착률 (전 티커 x 전 벤치마크 일괄 계산)
+        
+        benchmarks는 {시장: 벤치마크 티커}이며 각 티커는 자기 시장의 벤치마크 기준 값을 받습니다.
+        벤치마크 수익률이 없는 시장의 티커는 NaN입니다.
+        """
+        benchmarks = benchmarks or MARKET_BENCHMARKS
+        daily_risk_free_rate, _, _ = self._risk_free_inputs(returns, risk_free_rate)
+        result = pd.DataFrame(np.nan, index=returns.columns, columns=BENCHMARK_COLUMNS)
+        available = [tk for tk in dict.fromkeys(benchmarks.values()) if tk in returns.columns]
+        if not available:
+            return result
+        
+        values = benchmark_relative_metrics(returns.to_numpy(dtype=float), returns[available].to_numpy(dtype=float),
+                                            daily_risk_free_rate)
+        # 티커마다 자기 시장 벤치마크의 행을 한 번에 골라 담음 (벤치마크가 없는 시장은 -1 -> NaN 유지)
+        rows = {tk: i for i, tk in enumerate(available)}
+        bench_rows = np.array([rows.get(benchmarks.get(get_market(tk)), -1) for tk in returns.columns], dtype=int)
+        has_benchmark = bench_rows >= 0
+        cols = np.flatnonzero(has_benchmark)
+        result.iloc[cols] = values[bench_rows[has_benchmark], cols]
+        return result
+    
+    def optimize_clustering(self, data: pd.DataFrame, k_range=range(2, 11), random_state=42, return_details=False):
+        """클러스터링 최적화 (v3 구현)
+        
+        return_details가 True면 (임베딩, 라벨, 진단값 dict)를 반환합니다. 빌드와 백그라운드 갱신이 같은 인스턴스를
+        쓰므로 진단값(k, 실루엣, k별 점수, 캐시 적중 여부)은 인스턴스에 저장하지 않고 호출마다 돌려줍니다.
+        """
+        umap_data, labels, details = self._cluster_with_details(data, k_range, random_state)
+        return (umap_data, labels, details) if return_details else (umap_data, labels)
+    
+    def _cluster_with_details(self, data: pd.DataFrame, k_range, random_state):
         if data.empty or len(data) < max(k_range):
-            return np.array([]).reshape(0, 3), np.zeros(len(data) if not data.empty else 0, dtype=int)
+            return np.array([]).reshape(0, 3), np.zeros(len(data) if not data.empty else 0, dtype=int), {}
             
         scaler = RobustScaler()
         scaled_data = scaler.fit_transform(data.replace([np.inf, -np.inf], np.nan).fillna(0))
         
-        best_umap_data = None
+        # 결과는 입력 행렬과 파라미터로만 정해지므로 같은 입력이면 저장된 결과 사용
+        grid = umap_grid(len(scaled_data))
+        large_universe = len(scaled_data) >= self.large_universe_threshold
+        large_options = self.large_universe_options if large_universe else None
+        cache_key = self.clustering_cache.key(
+            scaled_data, k_range=list(k_range), random_state=random_state, grid=grid,
+            early_stop_score=self.umap_early_stop_score, large_options=large_options, k_criterion=self.k_criterion,
+            k_search='elbow_search' if self.k_criterion == 'elbow' else 'kmeans_sweep',
+            versions=[umap_version, sklearn_version]
+        )
+        cached = self.clustering_cache.get(cache_key)
+        if cached is not None:
+            arrays, meta, objects = cached
+            return arrays['embedding'], arrays['labels'], {**meta, **objects, 'centers': arrays.get('centers'),
+                                                           'cache_hit': True}
+        
+        best_umap_data, best_umap_score, best_umap_config, umap_reducer = None, np.nan, None, None
         if len(scaled_data) >= 2:
-            best_umap_score = -np.inf
-            n_neighbors_options = [5, 10, 15]
-            min_dist_options = [0.0, 0.1, 0.2]
-            
-            for n_neighbors in n_neighbors_options:
-                n_neighbors = min(n_neighbors, max(1, len(scaled_data) - 1))
-                for min_dist in min_dist_options:
-                    try:
-                        n_components = min(3, scaled_data.shape[1])
-                        if n_components == 0: 
-                            continue
-                            
-                        umap_reducer = umap.UMAP(
-                            n_components=n_components, 
-                            n_neighbors=n_neighbors, 
-                            min_dist=min_dist, 
-                            random_state=random_state
-                        )
-                        umap_data = umap_reducer.fit_transform(scaled_data)
-                        
-                        temp_k = min(3, max(2, len(umap_data) - 1))
-                        if temp_k < 2: 
-                            continue
-                            
-                        temp_kmeans = KMeans(n_clusters=temp_k, n_init='auto', random_state=random_state)
-                        temp_labels = temp_kmeans.fit_predict(umap_data)
-                        
-                        if len(set(temp_labels)) > 1:
-                            score = silhouette_score(umap_data, temp_labels)
-                            if score > best_umap_score:
-                                best_umap_score = score
-                                best_umap_data = umap_data
-                    except Exception:
-                        continue
+            # (n_neighbors, min_dist) 격자를 프로세스 풀에서 평가 (결과는 직렬 실행과 동일)
+            n_workers = min(len(grid), max(1, self.clustering_workers or 1))
+            search_options = {}
+            if large_universe:
+                # 근사 최근접 이웃 그래프를 한 번만 만들어 모든 조합이 잘라 씀 (검색 인덱스는 새 ETF transform용)
+                search_options = {'knn': ann_graph(scaled_data, max(n for n, _ in grid), random_state), **large_options}
+            best_umap_data, best_umap_score, _, best_umap_config, umap_reducer = search_umap_grid(
+                scaled_data, grid, random_state=random_state, n_workers=n_workers,
+                early_stop_score=self.umap_early_stop_score, **search_options
+            )
         
         if best_umap_data is None and scaled_data.shape[1] > 0:
             n_components = min(3, scaled_data.shape[1])
+            best_umap_config = (min(15, max(1, len(scaled_data) - 1)), 0.1)
             umap_reducer = umap.UMAP(
                 n_components=n_components, 
-                n_neighbors=min(15, max(1, len(scaled_data) - 1)), 
-                min_dist=0.1, 
+                n_neighbors=best_umap_config[0], 
+                min_dist=best_umap_config[1], 
                 random_state=random_state
             )
             best_umap_data = umap_reducer.fit_transform(scaled_data)
@@ -401,37 +612,57 @@ class RealETFRecommender:
         umap_data = best_umap_data if best_umap_data is not None else scaled_data[:, :min(3, scaled_data.shape[1])]
         
         if umap_data.shape[0] == 0:
-            return umap_data, np.zeros(len(data), dtype=int)
+            return umap_data, np.zeros(len(data), dtype=int), {}
         
         valid_k_list = [k for k in k_range if 2 <= k < len(umap_data)]
         if not valid_k_list:
-            return umap_data, np.zeros(len(umap_data), dtype=int)
-        
-        # Elbow method로 최적 k 찾기
-        wcss = []
-        for k in valid_k_list:
-            try:
-                km = KMeans(n_clusters=k, n_init='auto', random_state=random_state)
-                km.fit(umap_data)
-                wcss.append(km.inertia_)
-            except Exception:
-                continue
-        
-        best_k = 3
-        if len(wcss) >= 2:
-            kl = KneeLocator(valid_k_list[:len(wcss)], wcss, curve='convex', direction='decreasing', S=1.0)
-            best_k = kl.elbow if kl.elbow else best_k
+            return umap_data, np.zeros(len(umap_data), dtype=int), {}
         
+        # 엘보는 차이 곡선을 황금분할 탐색해 일부 k만 학습하고, 실루엣/CH는 k를 늘려 가며 이어 학습한 전체 스윕으로 고름
+        # (어느 쪽이든 고른 k의 학습 결과를 최종 라벨로 그대로 사용하고, 진단 점수는 학습한 k에 대해서만 계산)
+        silhouette_sample = large_options['silhouette_sample'] if large_universe else None
+        if self.k_criterion == 'elbow':
+            best_k, sweep_fits = elbow_search(umap_data, valid_k_list, random_state, mini_batch=large_universe)
+            best_k = best_k or 3
+        else:
+            sweep_fits = kmeans_sweep(umap_data, valid_k_list, random_state, mini_batch=large_universe)
+        scores = score_sweep(umap_data, sweep_fits, silhouette_sample, random_state)
+        if self.k_criterion != 'elbow':
+            best_k = select_k(scores, self.k_criterion)
         best_k = min(best_k, len(umap_data) - 1) if len(umap_data) > 1 else 1
         
         # 최종 클러스터링
+        centers, kmeans = None, None
         if best_k < 2:
             labels = np.zeros(len(umap_data), dtype=int)
+        elif best_k in sweep_fits:
+            kmeans = sweep_fits[best_k]
+            labels, centers = kmeans.labels_, kmeans.cluster_centers_
         else:
             kmeans = KMeans(n_clusters=best_k, n_init='auto', random_state=random_state)
             labels = kmeans.fit_predict(umap_data)
+            centers = kmeans.cluster_centers_
         
-        return umap_data, labels
+        if best_k in scores['k_values']:
+            silhouette = scores['silhouette'][scores['k_values'].index(best_k)]
+        else:
+            silhouette = (sampled_silhouette(umap_data, labels, silhouette_sample, random_state)
+                          if 1 < len(set(labels)) < len(umap_data) else np.nan)
+        diagnostics = {
+            'best_k': int(best_k), 'silhouette': silhouette,
+            'umap_silhouette': float(best_umap_score) if np.isfinite(best_umap_score) else np.nan,
+            'umap_params': list(best_umap_config) if best_umap_config is not None else None,
+            'k_criterion': self.k_criterion, 'k_values': scores['k_values'], 'wcss': scores['wcss'],
+            'k_silhouette': scores['silhouette'], 'k_calinski_harabasz': scores['calinski_harabasz'],
+            'large_universe': bool(large_universe)
+        }
+        arrays = {'embedding': umap_data, 'labels': labels}
+        if centers is not None:
+            arrays['centers'] = centers
+        # 학습된 스케일러/UMAP/KMeans도 함께 저장해 클러스터 모델을 다시 학습하지 않고 만들 수 있게 함
+        objects = {'scaler': scaler, 'reducer': umap_reducer, 'kmeans': kmeans} if umap_reducer is not None else {}
+        self.clustering_cache.put(cache_key, arrays, objects=objects, **diagnostics)
+        return umap_data, labels, {**diagnostics, **objects, 'centers': centers, 'cache_hit': False}
     
     def derive_user_quantitative_indicators(self, user_profile: dict) -> dict:
         """사용자 정량적 지표 도출 (v3 구현)"""
@@ -516,55 +747,237 @@ class RealETFRecommender:
         
         return sorted(cf_recommended_etfs.keys(), key=lambda x: cf_recommended_etfs[x], reverse=True)
     
+    def refresh_market_prices(self, market: str):
+        """장 마감 후 해당 시장 티커의 최신 구간만 갱신 (백그라운드 갱신용)"""
+        tickers = [tk for tk in self.all_tickers if get_market(tk) == market]
+        end_date_dt = datetime.now()
+        start_date_dt = end_date_dt - relativedelta(years=1)
+        # 데몬 스레드에는 Streamlit 화면이 없으므로 진행 표시는 하지 않음
+        self.fetch_etf_data_with_retry(tickers, start_date_dt.strftime('%Y-%m-%d'),
+                                       end_date_dt.strftime('%Y-%m-%d'), refresh_tail=True,
+                                       progress_callback=lambda done, total, tk: None)
+    
+    def _cluster_labels(self, metrics_df: pd.DataFrame, min_etfs: int = 5, model_name: str = None) -> np.ndarray:
+        """위험 지표로 클러스터 라벨 계산
+        
+        model_name이 있으면 저장된 클러스터 모델로 새 ETF만 배치하고, 모델이 없거나 오래됐거나
+        지표 드리프트/신규 ETF 비율이 기준을 넘으면 전체를 다시 학습해 모델을 저장합니다.
+        """
+        clustering_features = ['Annual Return', 'Annual Volatility', 'Sharpe Ratio', 'Max Drawdown', 'Sortino Ratio', 'Calmar Ratio', 'Skewness', 'Kurtosis', 'Ulcer Index', 'Omega Ratio', 'Beta', 'Tracking Error']
+        clustering_input = metrics_df[[f for f in clustering_features if f in metrics_df.columns]].replace([np.inf, -np.inf], np.nan).fillna(0)
+        
+        if clustering_input.shape[0] < min_etfs:
+            return np.zeros(clustering_input.shape[0], dtype=int)
+        
+        model_path = self.model_dir / f"{model_name}.pkl" if model_name else None
+        model = ClusterModel.load(model_path) if model_path else None
+        if model is not None and model.features == list(clustering_input.columns):
+            drift = model.drift(clustering_input)
+            reasons = [reason for reason, over in [
+                ('schedule', model.age_days() >= self.cluster_refit_days),
+                ('drift', drift['feature_drift'] > self.cluster_drift_threshold),
+                ('new_etfs', drift['new_ratio'] > self.cluster_new_ratio_threshold)
+            ] if over]
+            if not reasons:
+                self.last_cluster_update = {'mode': 'incremental', **drift,
+                                            'new_etfs': int((~clustering_input.index.isin(model.tickers)).sum())}
+                return model.assign(clustering_input)
+        else:
+            reasons = ['no_model']
+        
+        max_k = min(10, clustering_input.shape[0] - 1 if clustering_input.shape[0] > 1 else 1)
+        _, cluster_labels, clustering = self.optimize_clustering(clustering_input, k_range=range(2, max_k + 1),
+                                                                 random_state=42, return_details=True)
+        self.last_cluster_update = {'mode': 'refit', 'reasons': reasons}
+        
+        umap_params = clustering.get('umap_params')
+        if model_path and umap_params:
+            if clustering.get('reducer') is not None:
+                # 방금 (또는 캐시에서) 얻은 학습 결과를 그대로 모델로 저장
+                model = ClusterModel.from_fitted(clustering_input, cluster_labels, clustering['scaler'],
+                                                 clustering['reducer'], clustering['kmeans'], umap_params, random_state=42)
+            else:
+                # 학습 객체가 없는 이전 캐시 항목이면 같은 파라미터로 다시 학습
+                large_options = self.large_universe_options if clustering.get('large_universe') else None
+                model = ClusterModel.fit(clustering_input, umap_params, clustering['best_k'], random_state=42,
+                                         large_universe_options=large_options, centers=clustering.get('centers'))
+                # 같은 시드와 중심이라 라벨도 같아야 하지만 다르면 모델 쪽 라벨을 써서 이후 증분 배치와 일관되게 함
+                cluster_labels = model.labels
+            model.save(model_path)
+        return cluster_labels
+    
+    def _data_version(self, prices: pd.DataFrame, risk_free_series: pd.Series, starts: dict) -> str:
+        """가격/무위험 이자율/기간별 시작일 해시 (같으면 지표/클러스터 결과도 같음)"""
+        digest = hashlib.sha1()
+        digest.update(','.join(prices.columns).encode('utf-8'))
+        digest.update(prices.index.values.astype('M8[D]').tobytes())
+        digest.update(np.ascontiguousarray(prices.to_numpy(dtype=float)).tobytes())
+        digest.update(risk_free_series.to_numpy(dtype=float).tobytes())
+        digest.update(repr(sorted(starts.items())).encode('utf-8'))
+        return digest.hexdigest()[:16]
+    
+    def load_horizon_metrics(self, data_version: str) -> dict:
+        """저장된 기간별 지표/클러스터 결과 ({기간: metrics_df}, 버전이 다르면 빈 dict)"""
+        loaded = self.price_store.load_arrays('horizon_metrics')
+        if (loaded is None or loaded[1].get('data_version') != data_version
+                or loaded[1].get('columns') != STORED_METRIC_COLUMNS):
+            return {}
+        arrays, meta = loaded
+        horizon_metrics = {}
+        for years, tickers in meta['tickers'].items():
+            metrics_df = pd.DataFrame(arrays[f"h{years}_metrics"], index=tickers, columns=meta['columns'])
+            metrics_df['Market'] = [get_market(tk) for tk in tickers]
+            metrics_df['Cluster'] = arrays[f"h{years}_cluster"]
+            horizon_metrics[int(years)] = metrics_df
+        return horizon_metrics
+    
+    def save_horizon_metrics(self, data_version: str, snapshots: dict):
+        """기간별 지표/클러스터 결과를 데이터 버전과 함께 저장"""
+        arrays, tickers = {}, {}
+        for years, snapshot in snapshots.items():
+            arrays[f"h{years}_metrics"] = snapshot.metrics[STORED_METRIC_COLUMNS].to_numpy(dtype=float)
+            arrays[f"h{years}_cluster"] = snapshot.metrics['Cluster'].to_numpy(dtype=int)
+            tickers[str(years)] = list(snapshot.metrics.index)
+        self.price_store.save_arrays('horizon_metrics', arrays, data_version=data_version,
+                                     columns=STORED_METRIC_COLUMNS,
+                                     tickers=tickers, built_at=datetime.now().isoformat())
+    
+    def load_correlation(self, years: int, data_version: str, returns_df: pd.DataFrame) -> CorrelationMatrix:
+        """기간별 상관/공분산 행렬 (데이터 버전/축소 설정이 같으면 저장본 재사용, 아니면 다시 계산해 저장)"""
+        name = f"correlation_{years}y"
+        loaded = self.price_store.load_arrays(name)
+        if loaded is not None:
+            arrays, meta = loaded
+            if (meta.get('data_version') == data_version and meta.get('tickers') == list(returns_df.columns)
+                    and (meta.get('shrinkage', 0.0) > 0) == self.covariance_shrinkage):
+                return CorrelationMatrix.from_arrays(arrays, meta)
+        
+        correlation = CorrelationMatrix.from_returns(returns_df, shrink=self.covariance_shrinkage, data_version=data_version)
+        arrays, meta = correlation.to_arrays()
+        self.price_store.save_arrays(name, arrays, **meta)
+        return correlation
+    
+    def load_metric_intervals(self, years: int, data_version: str, returns_df: pd.DataFrame, risk_free_rate=0.0) -> pd.DataFrame:
+        """기간별 부트스트랩 신뢰구간 (데이터 버전/설정이 같으면 저장본 재사용, 아니면 다시 계산해 저장)"""
+        name = f"bootstrap_{years}y"
+        loaded = self.price_store.load_arrays(name)
+        if loaded is not None:
+            arrays, meta = loaded
+            if (meta.get('data_version') == data_version and meta.get('tickers') == list(returns_df.columns)
+                    and meta.get('config') == self.bootstrap_config):
+                return pd.DataFrame(arrays['intervals'], index=meta['tickers'], columns=BOOTSTRAP_COLUMNS)
+        
+        daily_risk_free_rate, risk_free_rate, _ = self._risk_free_inputs(returns_df, risk_free_rate)
+        values = bootstrap_intervals(returns_df.to_numpy(dtype=float), float(np.mean(daily_risk_free_rate)), risk_free_rate,
+                                     self._transaction_costs(returns_df.columns), n_jobs=self.bootstrap_workers,
+                                     **self.bootstrap_config)
+        self.price_store.save_arrays(name, {'intervals': values}, data_version=data_version,
+                                     tickers=list(returns_df.columns), config=self.bootstrap_config)
+        return pd.DataFrame(values, index=returns_df.columns, columns=BOOTSTRAP_COLUMNS)
+    
+    def build_market_snapshots(self) -> dict:
+        """모든 투자 기간의 시장 데이터 스냅샷을 한 번에 생성 (가격/수익률/위험 지표/클러스터)
+        
+        가장 긴 기간의 가격을 한 번만 수집해 기간별로 잘라 쓰고, 가격/이자율이 바뀌지 않았다면
+        저장된 기간별 지표/클러스터 결과를 그대로 사용합니다.
+        
+        Returns:
+            {투자 기간(년): MarketSnapshot}
+        """
+        end_date_dt = datetime.now()
+        end_date_str = end_date_dt.strftime('%Y-%m-%d')
+        starts = {
+            years: (end_date_dt - relativedelta(years=years)).strftime('%Y-%m-%d')
+            for years in self.horizon_years
+        }
+        # 수집 시작일만 월초로 고정 (한 달 동안 같은 수집 범위/데이터 버전 유지, 기간별로는 정확한 시작일로 자름)
+        longest_start = (end_date_dt - relativedelta(years=max(self.horizon_years))).replace(day=1).strftime('%Y-%m-%d')
+        
+        # 실제 ETF 데이터 가져오기 (가장 긴 기간 한 번)
+        # 갱신 데몬/비동기 갱신 스레드에는 Streamlit 화면이 없으므로 진행 표시 대신 로그를 남김
+        quiet = get_script_run_ctx(suppress_warning=True) is None
+        self._message('info', f"📊 {len(self.all_tickers)}개 ETF의 {max(self.horizon_years)}년간 실제 데이터를 수집합니다...",
+                      quiet)
+        etf_price_data, successful_tickers, fetch_details = self.fetch_etf_data_with_retry(
+            self.all_tickers, longest_start, end_date_str,
+            progress_callback=(lambda done, total, tk: None) if quiet else None)
+        
+        min_etfs = 5
+        if len(successful_tickers) < min_etfs:
+            raise ValueError(f"{len(successful_tickers)}개의 ETF만 가져왔습니다 (최소 {min_etfs}개 필요).")
+        
+        self._message('success', f"✅ {len(successful_tickers)}개 ETF 데이터 수집 완료!", quiet)
+        
+        # 보간된 가격은 제외하고 각 티커의 직전 실제 가격 대비로 수익률 계산
+        filled_mask = fetch_details['filled_mask']
+        actual_prices = etf_price_data.mask(filled_mask)
+        data_version = self._data_version(actual_prices, self.get_risk_free_series(longest_start, end_date_str, actual_prices.index),
+                                          starts)
+        stored_metrics = self.load_horizon_metrics(data_version)
+        
+        # 기간별 성과 조회용 인덱스 (전체 기간 공용)
+        return_index = ReturnIndex.from_prices(actual_prices)
+        
+        snapshots = {}
+        for years in self.horizon_years:
+            start_date_str = starts[years]
+            window_prices = actual_prices.loc[start_date_str:]
+            returns_df = np.log(window_prices / window_prices.ffill().shift(1)).iloc[1:].dropna(how='all', axis=0).dropna(how='all', axis=1)
+            if returns_df.empty or returns_df.shape[1] < min_etfs:
+                logging.warning(f"{years}년 기간의 유효한 수익률 데이터가 충분하지 않습니다.")
+                continue
+            
+            # 무위험 이자율 (로컬 저장소의 일별 시계열)
+            risk_free_series = self.get_risk_free_series(start_date_str, end_date_str, returns_df.index)
+            
+            metrics_df = stored_metrics.get(years)
+            if metrics_df is None or list(metrics_df.index) != list(returns_df.columns):
+                # 위험 지표 (거래일별 무위험 이자율 반영, 저장된 누적 상태에 증분 갱신) + 클러스터링
+                metrics_df = self.update_risk_metrics(f"metric_state_{years}y", returns_df, risk_free_series)
+                metrics_df[BENCHMARK_COLUMNS] = self.calculate_benchmark_metrics(returns_df, risk_free_series)
+                metrics_df[TAIL_COLUMNS] = self.calculate_tail_risk(returns_df)
+                metrics_df['Market'] = [get_market(tk) for tk in metrics_df.index]
+                metrics_df['Cluster'] = self._cluster_labels(metrics_df, min_etfs, model_name=f"cluster_{years}y")
+            
+            risk_free_rate = float(risk_free_series.mean())
+            snapshots[years] = MarketSnapshot(years, start_date_str, end_date_str,
+                                              etf_price_data.loc[start_date_str:], returns_df, metrics_df,
+                                              risk_free_rate, filled_mask=filled_mask.loc[start_date_str:],
+                                              return_index=return_index, data_version=data_version,
+                                              rolling_metrics=RollingMetrics(returns_df, risk_free_rate),
+                                              correlation=self.load_correlation(years, data_version, returns_df),
+                                              metric_intervals=self.load_metric_intervals(years, data_version, returns_df,
+                                                                                          risk_free_series))
+        
+        if not snapshots:
+            raise ValueError("유효한 수익률 데이터가 충분하지 않습니다.")
+        if any(stored_metrics.get(years) is not snap.metrics for years, snap in snapshots.items()):
+            self.save_horizon_metrics(data_version, snapshots)
+        return snapshots
+    
     def load_and_process_data(self, user_profile=None):
-        """데이터 로드 및 전처리 (v3 완전 구현)"""
+        """데이터 로드 및 전처리 (프로세스 전역 스냅샷 공유)"""
         try:
             if not FDR_AVAILABLE:
                 st.error("FinanceDataReader가 설치되지 않았습니다. pip install finance-datareader로 설치해주세요.")
                 return False
             
             # 투자 기간에 따른 데이터 수집 기간 결정
-            end_date_dt = datetime.now()
             horizon_years_map = {1: 1, 2: 3, 3: 5, 4: 10, 5: 10}
             data_period_years = horizon_years_map.get(user_profile['investment_horizon'], 5)
-            start_date_dt = end_date_dt - relativedelta(years=data_period_years)
-            start_date_str, end_date_str = start_date_dt.strftime('%Y-%m-%d'), end_date_dt.strftime('%Y-%m-%d')
             
-            # 실제 ETF 데이터 가져오기
-            st.info(f"📊 {len(self.all_tickers)}개 ETF의 {data_period_years}년간 실제 데이터를 수집합니다...")
-            etf_price_data, successful_tickers = self.fetch_etf_data_with_retry(self.all_tickers, start_date_str, end_date_str)
+            # 모든 세션이 같은 스냅샷을 참조하므로 세션에는 참조만 보관 (복사하지 않음)
+            snapshot = get_market_data_service().get_snapshot(data_period_years)
+            self.returns_df = snapshot.returns
+            self.metrics_df = snapshot.metrics
+            self.return_index = snapshot.return_index
+            self.rolling_metrics = snapshot.rolling_metrics
+            self.correlation = snapshot.correlation
+            self.metric_intervals = snapshot.metric_intervals
+            self.data_as_of = snapshot.created_at
             
-            min_etfs = 5
-            if len(successful_tickers) < min_etfs:
-                st.error(f"오류: {len(successful_tickers)}개의 ETF만 가져왔습니다 (최소 {min_etfs}개 필요).")
-                return False
-            
-            st.success(f"✅ {len(successful_tickers)}개 ETF 데이터 수집 완료!")
-            
-            # 수익률 계산
-            self.returns_df = np.log(etf_price_data / etf_price_data.shift(1)).iloc[1:].dropna(how='all', axis=0).dropna(how='all', axis=1)
-            
-            if self.returns_df.empty or self.returns_df.shape[1] < min_etfs:
-                st.error("오류: 유효한 수익률 데이터가 충분하지 않습니다.")
-                return False
-            
-            # 무위험 이자율 가져오기
-            risk_free_rate = self.fetch_risk_free_rate(start_date_str, end_date_str)
-            
-            # 위험 지표 계산
-            self.metrics_df = self.calculate_risk_metrics(self.returns_df, risk_free_rate)
-            self.metrics_df['Market'] = ['KR' if tk.isdigit() and len(tk) == 6 else 'US' for tk in self.metrics_df.index]
-            
-            # 클러스터링
-            clustering_features = ['Annual Return', 'Annual Volatility', 'Sharpe Ratio', 'Max Drawdown', 'Sortino Ratio', 'Calmar Ratio', 'Skewness', 'Kurtosis', 'Ulcer Index', 'Omega Ratio']
-            clustering_input = self.metrics_df[[f for f in clustering_features if f in self.metrics_df.columns]].replace([np.inf, -np.inf], np.nan).fillna(0)
-            
-            if clustering_input.shape[0] < min_etfs:
-                self.metrics_df['Cluster'] = 0
-            else:
-                max_k = min(10, clustering_input.shape[0] - 1 if clustering_input.shape[0] > 1 else 1)
-                _, cluster_labels = self.optimize_clustering(clustering_input, k_range=range(2, max_k + 1), random_state=42)
-                self.metrics_df['Cluster'] = cluster_labels
+            if snapshot.is_stale:
+                st.info(f"🔄 최신 데이터로 갱신 중입니다. 현재 {snapshot.age_seconds() / 3600:.1f}시간 전 데이터를 표시합니다.")
             
             self.is_data_loaded = True
             return True
@@ -645,6 +1058,10 @@ class RealETFRecommender:
             # 상위 N개 선택
             final_recommendations = recommendation_df.nlargest(top_n, 'RecommendationScore')
             
+            # 실제 3년/5년 누적 수익률과 CAGR (누적합 인덱스 조회, 이력이 부족하면 NaN)
+            trailing_3y = self.return_index.trailing(3, tickers=list(final_recommendations.index))
+            trailing_5y = self.return_index.trailing(5, tickers=list(final_recommendations.index))
+            
             # 결과 포맷팅
             result_df = pd.DataFrame()
             for ticker in final_recommendations.index:
@@ -654,13 +1071,19 @@ class RealETFRecommender:
                     'Category': self._get_etf_category(ticker),
                     'Market': final_recommendations.loc[ticker, 'Market'],
                     'Return_1Y': final_recommendations.loc[ticker, 'Annual Return'] * 100,
-                    'Return_3Y': final_recommendations.loc[ticker, 'Annual Return'] * 3 * 100,  # 근사치
+                    'Return_3Y': trailing_3y.loc[ticker, 'Return'] * 100,
+                    'Return_5Y': trailing_5y.loc[ticker, 'Return'] * 100,
+                    'CAGR_3Y': trailing_3y.loc[ticker, 'CAGR'] * 100,
+                    'CAGR_5Y': trailing_5y.loc[ticker, 'CAGR'] * 100,
                     'Volatility': final_recommendations.loc[ticker, 'Annual Volatility'] * 100,
                     'Sharpe_Ratio': final_recommendations.loc[ticker, 'Sharpe Ratio'],
                     'Max_Drawdown': final_recommendations.loc[ticker, 'Max Drawdown'] * 100,
                     'Sortino_Ratio': final_recommendations.loc[ticker, 'Sortino Ratio'],
                     'Calmar_Ratio': final_recommendations.loc[ticker, 'Calmar Ratio'],
                     'Omega_Ratio': final_recommendations.loc[ticker, 'Omega Ratio'],
+                    'Beta': final_recommendations.loc[ticker, 'Beta'],
+                    'Alpha': final_recommendations.loc[ticker, 'Alpha'] * 100,
+                    'Information_Ratio': final_recommendations.loc[ticker, 'Information Ratio'],
                     'AUM': np.random.uniform(1000, 50000),  # 임시값
                     'Expense_Ratio': np.random.uniform(0.05, 0.75),  # 임시값
                     'Recommendation_Score': final_recommendations.loc[ticker, 'RecommendationScore']
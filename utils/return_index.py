@@ -0,0 +1,132 @@
+# 임의 기간 수익률/변동성 조회용 누적합 인덱스
+# 티커별 로그수익률, 제곱 로그수익률, 관측 수의 누적합을 보관해 어떤 [시작, 끝] 구간이든 뺄셈 한 번으로 계산
+
+import threading
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from utils.drawdown_tree import DrawdownTree
+
+WINDOW_COLUMNS = ['Return', 'CAGR', 'Annual Return', 'Annual Volatility', 'Observations']
+
+
+class ReturnIndex:
+    """가격 이력 전체에 대한 누적합 인덱스
+
+    cum_log[k]는 첫 거래일부터 k번째 거래일까지의 로그수익률 합이므로
+    cum_log[j] - cum_log[i]는 i일 종가 대비 j일 종가의 로그수익률입니다.
+    보간으로 채운 가격(NaN으로 전달)은 건너뛰고 직전 실제 가격 대비로 계산합니다.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, tickers: list, cum_log: np.ndarray, cum_sq: np.ndarray,
+                 cum_count: np.ndarray, first_valid: np.ndarray, annual_factor: int = 252):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = list(tickers)
+        self.cum_log = cum_log
+        self.cum_sq = cum_sq
+        self.cum_count = cum_count
+        self.first_valid = first_valid  # 티커별 첫 실제 가격 날짜 (datetime64)
+        self.annual_factor = annual_factor
+        self.positions = {tk: i for i, tk in enumerate(self.tickers)}
+        self.drawdown_tree = None  # 첫 낙폭 조회 때 생성
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_prices(cls, prices: pd.DataFrame, annual_factor: int = 252):
+        """실제 가격 DataFrame(보간 칸은 NaN)으로 인덱스 생성"""
+        values = prices.to_numpy(dtype=np.float64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            log_returns = np.log(values / prices.ffill().shift(1).to_numpy(dtype=np.float64))
+        valid = np.isfinite(log_returns)
+        log_returns[~valid] = 0.0
+
+        has_price = ~np.isnan(values)
+        first_rows = np.where(has_price.any(axis=0), has_price.argmax(axis=0), len(values) - 1)
+        first_valid = prices.index.values[first_rows] if len(values) else np.array([], dtype='M8[ns]')
+        first_valid = np.where(has_price.any(axis=0), first_valid, np.datetime64('NaT'))
+
+        return cls(prices.index, prices.columns, np.cumsum(log_returns, axis=0),
+                   np.cumsum(log_returns * log_returns, axis=0), np.cumsum(valid, axis=0, dtype=np.int32),
+                   first_valid, annual_factor)
+
+    @property
+    def nbytes(self) -> int:
+        tree_bytes = self.drawdown_tree.nodes.nbytes if self.drawdown_tree is not None else 0
+        return int(self.cum_log.nbytes + self.cum_sq.nbytes + self.cum_count.nbytes + tree_bytes)
+
+    def _bounds(self, start, end):
+        """[start, end] 안의 첫/마지막 거래일 위치 (구간이 비면 None)"""
+        i = self.dates.searchsorted(pd.Timestamp(start), side='left')
+        j = self.dates.searchsorted(pd.Timestamp(end), side='right') - 1
+        if i >= len(self.dates) or j <= i:
+            return None
+        return i, j
+
+    def window(self, start, end, tickers: list = None, max_gap_days: int = 7) -> pd.DataFrame:
+        """구간 수익률/CAGR/연율화 수익률·변동성
+
+        시작일 이후 max_gap_days 안에 실제 가격이 없는 티커(상장 전 구간 포함)는 NaN입니다.
+
+        Returns:
+            티커 x WINDOW_COLUMNS DataFrame (Return, CAGR은 소수 - 0.12 = 12%)
+        """
+        tickers = self.tickers if tickers is None else [tk for tk in tickers if tk in self.positions]
+        cols = np.array([self.positions[tk] for tk in tickers], dtype=int)
+        result = pd.DataFrame(np.nan, index=tickers, columns=WINDOW_COLUMNS)
+        bounds = self._bounds(start, end)
+        if bounds is None or len(cols) == 0:
+            return result
+        i, j = bounds
+
+        total_log = self.cum_log[j, cols] - self.cum_log[i, cols]
+        total_sq = self.cum_sq[j, cols] - self.cum_sq[i, cols]
+        n = (self.cum_count[j, cols] - self.cum_count[i, cols]).astype(np.float64)
+        years = (self.dates[j] - self.dates[i]).days / 365.25
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = total_log / n
+            variance = np.maximum(total_sq - total_log * mean, 0.0) / (n - 1)
+            values = np.column_stack([
+                np.expm1(total_log),
+                np.expm1(total_log / years) if years > 0 else np.full(len(cols), np.nan),
+                mean * self.annual_factor,
+                np.sqrt(variance * self.annual_factor),
+                n
+            ])
+
+        covered = self.first_valid[cols] <= np.datetime64(pd.Timestamp(start) + pd.Timedelta(days=max_gap_days))
+        values[~covered | (n < 2), :4] = np.nan
+        result.loc[:, :] = values
+        return result
+
+    def trailing(self, years: int, end=None, tickers: list = None) -> pd.DataFrame:
+        """마지막 거래일(또는 end)로부터 최근 years년 구간"""
+        end = pd.Timestamp(end) if end is not None else self.dates[-1]
+        return self.window(end - relativedelta(years=years), end, tickers=tickers)
+
+    def max_drawdown(self, start, end, tickers: list = None) -> pd.DataFrame:
+        """구간 최대 낙폭과 고점/저점 날짜 (세그먼트 트리로 O(log T) 조회)
+
+        Returns:
+            티커 x ['Max Drawdown', 'Peak Date', 'Trough Date'] DataFrame (낙폭은 소수, 0 이하)
+        """
+        tickers = self.tickers if tickers is None else [tk for tk in tickers if tk in self.positions]
+        result = pd.DataFrame({'Max Drawdown': np.nan, 'Peak Date': pd.NaT, 'Trough Date': pd.NaT}, index=tickers)
+        bounds = self._bounds(start, end)
+        if bounds is None or not tickers:
+            return result
+
+        with self.lock:
+            if self.drawdown_tree is None:
+                self.drawdown_tree = DrawdownTree(self.cum_log)
+        drawdown, peak, trough = self.drawdown_tree.query(*bounds)
+
+        cols = np.array([self.positions[tk] for tk in tickers], dtype=int)
+        result['Max Drawdown'] = drawdown[cols]
+        result['Peak Date'] = self.dates[peak[cols]]
+        result['Trough Date'] = self.dates[trough[cols]]
+        uncovered = ~(self.first_valid[cols] < np.datetime64(self.dates[bounds[1]]))
+        result.loc[uncovered] = [np.nan, pd.NaT, pd.NaT]
+        return result
@@ -0,0 +1,415 @@
+# 위험 지표 계산 엔진
+# 수익률 행렬(거래일 x 티커)을 열 묶음 단위로 훑으며 모든 지표를 미리 할당한 버퍼 위에서 계산
+
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+# calculate_risk_metrics가 반환하는 열 순서
+METRIC_COLUMNS = [
+    'Annual Return', 'Annual Volatility', 'Sharpe Ratio', 'Max Drawdown', 'Ulcer Index',
+    'Downside Risk', 'Sortino Ratio', 'Omega Ratio', 'Calmar Ratio', 'Skewness', 'Kurtosis',
+    'Recent Return', 'Recent Volatility'
+]
+
+# tail_risk_metrics 신뢰수준과 열 이름 (수준마다 역사적 VaR, CVaR, Cornish-Fisher VaR)
+TAIL_LEVELS = (0.95, 0.99)
+TAIL_COLUMNS = [f"{name} {int(level * 100)}" for level in TAIL_LEVELS for name in ('VaR', 'CVaR', 'CF VaR')]
+
+# 티커별 누적 통계 (지표 계산에 필요한 충분 통계량)
+STATE_FIELDS = [
+    'count', 'mean', 'm2', 'm3', 'm4',        # 유효 수익률의 개수/평균/중심 적률 합
+    'down_mean', 'down_m2',                   # 하방 수익률(기준 이상은 0)의 평균/제곱 편차 합 (전체 거래일 기준)
+    'gain_sum', 'loss_sum',                   # 오메가 비율용 초과수익 이득/손실 합
+    'wealth', 'peak', 'max_drawdown', 'drawdown_sq_sum'  # 누적 자산, 고점, 최대 낙폭, 낙폭 제곱 합
+]
+
+
+def _safe_ratio(numerator, denominator, mask):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(mask, numerator / denominator, 0.0)
+
+
+def _skew_kurt(count, m2, m3, m4):
+    """pandas Series.skew()/kurt()와 같은 편향 보정 왜도/첨도"""
+    # 부동소수점 오차로 남은 0에 가까운 적률은 상수 열로 간주 (pandas와 동일)
+    m2 = np.where(np.abs(m2) < 1e-14, 0.0, m2)
+    m3 = np.where(np.abs(m3) < 1e-14, 0.0, m3)
+    m4 = np.where(np.abs(m4) < 1e-14, 0.0, m4)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        skew = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+        adj = 3 * (count - 1) ** 2 / ((count - 2) * (count - 3))
+        numerator = count * (count + 1) * (count - 1) * m4
+        denominator = (count - 2) * (count - 3) * m2 ** 2
+        kurt = numerator / denominator - adj
+
+    skew = np.where(m2 == 0, 0.0, skew)
+    skew[count < 3] = np.nan
+    kurt = np.where(denominator == 0, 0.0, kurt)
+    kurt[count < 4] = np.nan
+    return skew, kurt
+
+
+def _as_threshold(daily_risk_free_rate):
+    threshold = np.asarray(daily_risk_free_rate, dtype=np.float64)
+    return threshold[:, None] if threshold.ndim == 1 else threshold
+
+
+def accumulate_returns(values: np.ndarray, daily_risk_free_rate, chunk_size: int = 256) -> dict:
+    """수익률 행렬 전체를 훑어 티커별 누적 통계(STATE_FIELDS)를 계산
+
+    결측(NaN)은 pandas의 skipna 규칙과 같게 처리합니다.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    threshold = _as_threshold(daily_risk_free_rate)
+    state = {field: np.zeros(n_cols) for field in STATE_FIELDS}
+    state['peak'].fill(-np.inf)
+    state['max_drawdown'].fill(np.nan)
+    if n_cols == 0:
+        return state
+
+    width = max(1, min(chunk_size, n_cols))
+    # 열 묶음마다 재사용하는 작업 버퍼
+    x_buf = np.empty((n_rows, width))
+    work_buf = np.empty((n_rows, width))
+    peak_buf = np.empty((n_rows, width))
+    valid_buf = np.empty((n_rows, width), dtype=bool)
+    invalid_buf = np.empty((n_rows, width), dtype=bool)
+
+    for start in range(0, n_cols, width):
+        stop = min(start + width, n_cols)
+        c = stop - start
+        x, work, peak = x_buf[:, :c], work_buf[:, :c], peak_buf[:, :c]
+        valid, invalid = valid_buf[:, :c], invalid_buf[:, :c]
+
+        np.copyto(x, values[:, start:stop])
+        np.isnan(x, out=invalid)
+        np.logical_not(invalid, out=valid)
+        x[invalid] = 0.0
+        count = valid.sum(axis=0).astype(np.float64)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 평균과 중심 적률 (표준편차, 왜도, 첨도)
+            mean = np.where(count > 0, x.sum(axis=0) / count, 0.0)
+            np.subtract(x, mean, out=peak)
+            peak[invalid] = 0.0
+            np.multiply(peak, peak, out=work)
+            m2 = work.sum(axis=0)
+            work *= peak
+            m3 = work.sum(axis=0)
+            work *= peak
+            m4 = work.sum(axis=0)
+
+            # 초과수익 기준 오메가 (일별 이자율 기준, 결측 제외)
+            np.subtract(x, threshold, out=work)
+            work[invalid] = 0.0
+            np.clip(work, 0.0, None, out=peak)
+            gain_sum = peak.sum(axis=0)
+            np.negative(work, out=work)
+            np.clip(work, 0.0, None, out=work)
+            loss_sum = work.sum(axis=0)
+
+            # 하방 수익률 (기준 미만 수익률만 남기고 나머지는 0, 전체 거래일 기준)
+            np.less(x, threshold, out=invalid)
+            work.fill(0.0)
+            np.copyto(work, x, where=invalid)
+            down_mean = work.sum(axis=0) / n_rows if n_rows else np.zeros(c)
+            work -= down_mean
+            work *= work
+            down_m2 = work.sum(axis=0)
+
+            # 누적 자산과 고점 대비 낙폭 (첫 유효 거래일 이전은 고점 계산에서 제외)
+            np.add(x, 1.0, out=work)
+            np.cumprod(work, axis=0, out=work)
+            wealth = work[-1].copy() if n_rows else np.ones(c)
+            np.logical_or.accumulate(valid, axis=0, out=invalid)
+            np.copyto(peak, work)
+            peak[~invalid] = -np.inf
+            np.maximum.accumulate(peak, axis=0, out=peak)
+            last_peak = peak[-1].copy() if n_rows else np.full(c, -np.inf)
+            work -= peak
+            work /= peak
+            work[~valid] = 0.0
+            max_drawdown = np.where(count > 0, work.min(axis=0) if n_rows else 0.0, np.nan)
+            work *= work
+            drawdown_sq_sum = work.sum(axis=0)
+
+        chunk_state = {
+            'count': count, 'mean': mean, 'm2': m2, 'm3': m3, 'm4': m4,
+            'down_mean': down_mean, 'down_m2': down_m2, 'gain_sum': gain_sum, 'loss_sum': loss_sum,
+            'wealth': wealth, 'peak': last_peak, 'max_drawdown': max_drawdown, 'drawdown_sq_sum': drawdown_sq_sum
+        }
+        for field in STATE_FIELDS:
+            state[field][start:stop] = chunk_state[field]
+    return state
+
+
+def _recent_stats(recent: np.ndarray, annual_factor: int):
+    """최근 구간(annual_factor 거래일)의 연율화 수익률/변동성"""
+    recent_valid = ~np.isnan(recent)
+    recent_count = recent_valid.sum(axis=0).astype(np.float64)
+    recent = np.where(recent_valid, recent, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        recent_mean = recent.sum(axis=0) / recent_count
+        recent_dev = np.where(recent_valid, recent - recent_mean, 0.0)
+        recent_std = np.sqrt((recent_dev * recent_dev).sum(axis=0) / (recent_count - 1))
+    return recent_mean * annual_factor, recent_std * np.sqrt(annual_factor)
+
+
+def finalize_metrics(state: dict, n_rows: int, recent, risk_free_rate: float, costs: np.ndarray,
+                     annual_factor: int = 252) -> np.ndarray:
+    """누적 통계를 (티커, len(METRIC_COLUMNS)) 지표 배열로 변환
+
+    Args:
+        n_rows: 누적한 거래일 수 (결측 포함)
+        recent: 최근 annual_factor 거래일의 수익률 배열 (거래일이 부족하면 None)
+    """
+    count = state['count']
+    n_cols = len(count)
+    sqrt_factor = np.sqrt(annual_factor)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count > 0, state['mean'], np.nan)
+        annual_return = mean * annual_factor - np.asarray(costs, dtype=np.float64)
+        annual_vol = np.sqrt(state['m2'] / (count - 1)) * sqrt_factor
+        downside_risk = np.sqrt(state['down_m2'] / (n_rows - 1)) * sqrt_factor
+        gain = state['gain_sum'] / count
+        loss = state['loss_sum'] / count
+        max_drawdown = state['max_drawdown']
+        ulcer = np.sqrt(state['drawdown_sq_sum'] / count)
+
+    skew, kurt = _skew_kurt(count, state['m2'], state['m3'], state['m4'])
+    if recent is not None:
+        recent_return, recent_vol = _recent_stats(recent, annual_factor)
+    else:
+        recent_return = recent_vol = np.full(n_cols, np.nan)
+
+    excess = annual_return - risk_free_rate
+    out = np.column_stack([
+        annual_return,
+        annual_vol,
+        _safe_ratio(excess, annual_vol, annual_vol > 1e-6),
+        max_drawdown,
+        ulcer,
+        downside_risk,
+        _safe_ratio(excess, downside_risk, downside_risk > 1e-6),
+        _safe_ratio(gain, loss, loss > 1e-9),
+        _safe_ratio(annual_return, -max_drawdown, np.abs(max_drawdown) > 1e-6),
+        skew,
+        kurt,
+        recent_return,
+        recent_vol
+    ]) if n_cols else np.empty((0, len(METRIC_COLUMNS)))
+    out[~np.isfinite(out)] = 0.0
+    return out
+
+
+def compute_risk_metrics(values: np.ndarray, daily_risk_free_rate, risk_free_rate: float,
+                         costs: np.ndarray, annual_factor: int = 252, chunk_size: int = 256) -> np.ndarray:
+    """수익률 행렬의 위험 지표를 한 번에 계산
+
+    결측(NaN)은 pandas의 skipna 규칙과 같게 처리하므로 기존 DataFrame 구현과 수치적으로 같습니다.
+
+    Args:
+        values: (거래일, 티커) 일별 수익률 배열
+        daily_risk_free_rate: 일별 무위험 이자율 (스칼라 또는 거래일 길이 배열)
+        risk_free_rate: 초과수익 계산에 쓰는 연율 무위험 이자율
+        costs: 티커별 연간 거래 비용
+
+    Returns:
+        (티커, len(METRIC_COLUMNS)) 배열 - 결측/무한대는 0
+    """
+    values = np.asarray(values, dtype=np.float64)
+    state = accumulate_returns(values, daily_risk_free_rate, chunk_size=chunk_size)
+    recent = values[-annual_factor:] if len(values) >= annual_factor else None
+    return finalize_metrics(state, len(values), recent, risk_free_rate, costs, annual_factor)
+
+
+def tail_risk_metrics(values: np.ndarray, levels=TAIL_LEVELS, chunk_size: int = 256) -> np.ndarray:
+    """신뢰수준별 역사적 VaR/CVaR와 Cornish-Fisher VaR (일별 수익률 기준, 손실은 음수)
+
+    전체 정렬 대신 np.partition으로 하위 꼬리만 골라 정렬하며, 역사적 VaR는
+    pandas Series.quantile(1 - level)과, CVaR는 VaR 이하 수익률의 평균과 같습니다.
+
+    Returns:
+        (티커, 3 * len(levels)) 배열 - 수준마다 [VaR, CVaR, Cornish-Fisher VaR], 관측이 부족하면 NaN
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n_rows, n_cols = values.shape
+    tails = [1.0 - level for level in levels]
+    z_scores = [NormalDist().inv_cdf(tail) for tail in tails]
+    out = np.full((n_cols, 3 * len(levels)), np.nan)
+    if n_cols == 0 or n_rows == 0:
+        return out
+
+    width = max(1, min(chunk_size, n_cols))
+    for start in range(0, n_cols, width):
+        stop = min(start + width, n_cols)
+        x = values[:, start:stop]
+        valid = ~np.isnan(x)
+        count = valid.sum(axis=0)
+        last = np.maximum(count - 1, 0)
+
+        # 수준별 보간 위치 (pandas linear 보간과 같음)
+        positions = [last * tail for tail in tails]
+        lows = [np.floor(h).astype(np.int64) for h in positions]
+        highs = [np.minimum(lo + 1, last) for lo in lows]
+        kmax = int(max(hi.max() for hi in highs))
+
+        # 결측은 +inf로 보내고 하위 kmax + 1개만 정렬
+        tail_rows = np.partition(np.where(valid, x, np.inf), kmax, axis=0)[:kmax + 1]
+        tail_rows.sort(axis=0)
+        tail_csum = np.cumsum(np.where(np.isfinite(tail_rows), tail_rows, 0.0), axis=0)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(count > 0, np.where(valid, x, 0.0).sum(axis=0) / count, np.nan)
+            dev = np.where(valid, x - mean, 0.0)
+            dev2 = dev * dev
+            m2, m3, m4 = dev2.sum(axis=0), (dev2 * dev).sum(axis=0), (dev2 * dev2).sum(axis=0)
+            std = np.sqrt(m2 / (count - 1))
+        skew, kurt = _skew_kurt(count.astype(np.float64), m2, m3, m4)
+
+        for i, (h, lo, hi, z) in enumerate(zip(positions, lows, highs, z_scores)):
+            low_value = np.take_along_axis(tail_rows, lo[None, :], axis=0)[0]
+            high_value = np.take_along_axis(tail_rows, hi[None, :], axis=0)[0]
+            with np.errstate(invalid='ignore'):
+                var = low_value + (h - lo) * (high_value - low_value)
+            cvar = np.take_along_axis(tail_csum, lo[None, :], axis=0)[0] / (lo + 1)
+            z_cf = (z + (z ** 2 - 1) * skew / 6 + (z ** 3 - 3 * z) * kurt / 24
+                    - (2 * z ** 3 - 5 * z) * skew ** 2 / 36)
+            out[start:stop, 3 * i:3 * i + 3] = np.column_stack([var, cvar, mean + z_cf * std])
+
+        out[start:stop][count < 2] = np.nan
+    return out
+
+
+class MetricAccumulator:
+    """티커별 위험 지표 누적 상태 (새 거래일마다 O(1) 갱신)
+
+    기간 시작일(anchor)부터의 누적 통계를 보관하고, 새 거래일 수익률이 들어오면
+    Welford 방식으로 평균/중심 적률을, 누적 자산으로 고점/낙폭을, 합계로 오메가를 갱신합니다.
+    최근 1년 지표는 마지막 annual_factor 거래일을 담은 순환 버퍼에서 계산합니다.
+    """
+
+    def __init__(self, tickers: list, anchor, state: dict, rows: int, last_date, rf_sum: float,
+                 recent: np.ndarray, recent_pos: int, annual_factor: int = 252):
+        self.tickers = list(tickers)
+        self.anchor = pd.Timestamp(anchor)
+        self.state = state
+        self.rows = int(rows)
+        self.last_date = pd.Timestamp(last_date)
+        self.rf_sum = float(rf_sum)  # 연율 무위험 이자율 합 (기간 평균용)
+        self.recent = recent
+        self.recent_pos = int(recent_pos)
+        self.annual_factor = annual_factor
+
+    @classmethod
+    def from_returns(cls, returns: pd.DataFrame, daily_risk_free_rate, risk_free_annual: np.ndarray,
+                     annual_factor: int = 252):
+        """수익률 행렬 전체로 상태 생성"""
+        values = returns.to_numpy(dtype=np.float64)
+        recent = np.full((annual_factor, values.shape[1]), np.nan)
+        tail = values[-annual_factor:]
+        recent[:len(tail)] = tail
+        return cls(returns.columns, returns.index[0], accumulate_returns(values, daily_risk_free_rate),
+                   len(values), returns.index[-1], float(np.sum(risk_free_annual)), recent,
+                   len(tail) % annual_factor, annual_factor)
+
+    def can_extend(self, returns: pd.DataFrame, risk_free_annual: np.ndarray) -> bool:
+        """이 상태에 returns의 새 거래일만 이어 붙이면 되는지 확인
+
+        시작일/티커/기존 거래일이 같고, 기존 구간의 수익률 합과 이자율 합이 그대로여야 합니다.
+        (수정 가격 재다운로드나 뒤늦게 채워진 과거 가격이 있으면 전체 재계산)
+        """
+        if list(returns.columns) != self.tickers or len(returns) < self.rows or self.rows == 0:
+            return False
+        if returns.index[0] != self.anchor or returns.index[self.rows - 1] != self.last_date:
+            return False
+
+        past = returns.to_numpy(dtype=np.float64)[:self.rows]
+        if not np.array_equal((~np.isnan(past)).sum(axis=0), self.state['count']):
+            return False
+        past_sum = np.nansum(past, axis=0)
+        if not np.allclose(past_sum, self.state['mean'] * self.state['count'], rtol=1e-9, atol=1e-12):
+            return False
+        return bool(np.isclose(np.sum(risk_free_annual[:self.rows]), self.rf_sum, rtol=1e-12, atol=0.0))
+
+    def update(self, row: np.ndarray, daily_risk_free_rate: float, risk_free_annual: float):
+        """새 거래일 하나의 수익률(티커 길이 배열)을 반영"""
+        s = self.state
+        row = np.asarray(row, dtype=np.float64)
+        valid = ~np.isnan(row)
+        x = np.where(valid, row, 0.0)
+        threshold = daily_risk_free_rate
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 평균/중심 적률 (Welford/Terriberry 갱신, 결측이면 그대로)
+            n1 = s['count']
+            n = n1 + valid
+            delta = np.where(valid, x - s['mean'], 0.0)
+            delta_n = np.where(valid, delta / n, 0.0)
+            delta_n2 = delta_n * delta_n
+            term1 = delta * delta_n * n1
+            s['mean'] = s['mean'] + delta_n
+            s['m4'] = s['m4'] + term1 * delta_n2 * (n * n - 3 * n + 3) + 6 * delta_n2 * s['m2'] - 4 * delta_n * s['m3']
+            s['m3'] = s['m3'] + term1 * delta_n * (n - 2) - 3 * delta_n * s['m2']
+            s['m2'] = s['m2'] + term1
+            s['count'] = n
+
+            # 하방 수익률 (전체 거래일 기준 Welford)
+            down = np.where(x < threshold, x, 0.0)
+            rows = self.rows + 1
+            down_delta = down - s['down_mean']
+            s['down_mean'] = s['down_mean'] + down_delta / rows
+            s['down_m2'] = s['down_m2'] + down_delta * (down - s['down_mean'])
+
+            # 오메가 이득/손실
+            excess = np.where(valid, x - threshold, 0.0)
+            s['gain_sum'] = s['gain_sum'] + np.maximum(excess, 0.0)
+            s['loss_sum'] = s['loss_sum'] + np.maximum(-excess, 0.0)
+
+            # 누적 자산/고점/낙폭
+            s['wealth'] = np.where(valid, s['wealth'] * (1.0 + x), s['wealth'])
+            s['peak'] = np.where(valid, np.maximum(s['peak'], s['wealth']), s['peak'])
+            drawdown = np.where(valid, (s['wealth'] - s['peak']) / s['peak'], 0.0)
+            s['max_drawdown'] = np.where(valid, np.fmin(s['max_drawdown'], drawdown), s['max_drawdown'])
+            s['drawdown_sq_sum'] = s['drawdown_sq_sum'] + drawdown * drawdown
+
+        self.rows = rows
+        self.rf_sum += float(risk_free_annual)
+        self.recent[self.recent_pos] = row
+        self.recent_pos = (self.recent_pos + 1) % self.annual_factor
+
+    def extend(self, returns: pd.DataFrame, daily_risk_free_rate: np.ndarray, risk_free_annual: np.ndarray):
+        """can_extend를 통과한 returns에서 아직 반영하지 않은 거래일만 순서대로 반영"""
+        values = returns.to_numpy(dtype=np.float64)
+        daily = np.broadcast_to(np.asarray(daily_risk_free_rate, dtype=np.float64), (len(values),))
+        for i in range(self.rows, len(values)):
+            self.update(values[i], daily[i], risk_free_annual[i])
+        self.last_date = returns.index[-1]
+
+    def metrics(self, costs: np.ndarray) -> np.ndarray:
+        """현재 상태의 지표 배열 (compute_risk_metrics와 같은 열 순서)"""
+        recent = self.recent if self.rows >= self.annual_factor else None
+        risk_free_rate = self.rf_sum / self.rows if self.rows else 0.0
+        return finalize_metrics(self.state, self.rows, recent, risk_free_rate, costs, self.annual_factor)
+
+    def to_arrays(self):
+        """PriceStore.save_arrays에 넘길 (배열 dict, meta dict)"""
+        arrays = {field: self.state[field] for field in STATE_FIELDS}
+        arrays['recent'] = self.recent
+        meta = {
+            'tickers': self.tickers, 'anchor': self.anchor.isoformat(), 'rows': self.rows,
+            'last_date': self.last_date.isoformat(), 'rf_sum': self.rf_sum,
+            'recent_pos': self.recent_pos, 'annual_factor': self.annual_factor
+        }
+        return arrays, meta
+
+    @classmethod
+    def from_arrays(cls, arrays: dict, meta: dict):
+        state = {field: np.array(arrays[field], dtype=np.float64) for field in STATE_FIELDS}
+        return cls(meta['tickers'], meta['anchor'], state, meta['rows'], meta['last_date'], meta['rf_sum'],
+                   np.array(arrays['recent'], dtype=np.float64), meta['recent_pos'], meta['annual_factor'])
@@ -0,0 +1,132 @@
+# 롤링 위험 지표 엔진
+# 누적합(이동 합계)과 슬라이딩 윈도 뷰로 여러 티커의 롤링 변동성/샤프/낙폭/베타/상관계수를 한 번에 계산
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+ROLLING_METRICS = ['Volatility', 'Sharpe', 'Drawdown', 'Beta', 'Correlation']
+
+
+def window_sums(values: np.ndarray, window: int) -> np.ndarray:
+    """각 행에서 끝나는 최근 window행의 합 (앞쪽 행은 가능한 만큼만 합산)"""
+    csum = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(values, axis=0, out=csum[1:])
+    starts = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    return csum[1:] - csum[starts]
+
+
+def rolling_moments(values: np.ndarray, window: int, min_periods: int):
+    """결측을 건너뛴 롤링 (관측 수, 평균, 표본 분산) - pandas rolling(window, min_periods)와 같은 규칙"""
+    valid = ~np.isnan(values)
+    # 열 평균을 빼고 합산해 누적합 차이의 자릿수 손실을 줄임
+    center = np.nanmean(values, axis=0) if valid.any() else np.zeros(values.shape[1:])
+    centered = np.where(valid, values - np.nan_to_num(center), 0.0)
+
+    count = window_sums(valid.astype(np.float64), window)
+    total = window_sums(centered, window)
+    total_sq = window_sums(centered * centered, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.maximum(total_sq - total * mean, 0.0) / (count - 1)
+    mean = mean + np.nan_to_num(center)
+    enough = count >= min_periods
+    return count, np.where(enough, mean, np.nan), np.where(enough & (count > 1), variance, np.nan)
+
+
+def rolling_drawdown(values: np.ndarray, window: int) -> np.ndarray:
+    """최근 window 거래일 고점 대비 현재 낙폭 (로그수익률 입력, 단순 수익률 기준 출력)"""
+    valid = ~np.isnan(values)
+    log_wealth = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    # 창의 첫 수익률 직전 종가부터 현재까지 window + 1개 종가 중 고점 (앞쪽은 -inf로 채움)
+    padded = np.concatenate([np.full((window - 1,) + values.shape[1:], -np.inf),
+                             np.zeros((1,) + values.shape[1:]), log_wealth])
+    # (거래일, 티커, window + 1) 뷰에서 최댓값 - 복사 없이 스트라이드로 창을 만듦
+    peak = sliding_window_view(padded, window + 1, axis=0).max(axis=-1)
+    drawdown = np.expm1(log_wealth - peak)
+    drawdown[~np.logical_or.accumulate(valid, axis=0)] = np.nan
+    return drawdown
+
+
+def rolling_beta_correlation(values: np.ndarray, benchmark: np.ndarray, window: int, min_periods: int):
+    """벤치마크 대비 롤링 베타/상관계수 (두 수익률이 모두 있는 거래일만 사용)"""
+    benchmark = np.broadcast_to(benchmark[:, None], values.shape)
+    valid = ~np.isnan(values) & ~np.isnan(benchmark)
+    x_center = np.nan_to_num(np.nanmean(np.where(valid, values, np.nan), axis=0))
+    b_center = np.nan_to_num(np.nanmean(np.where(valid, benchmark, np.nan), axis=0))
+    x = np.where(valid, values - x_center, 0.0)
+    b = np.where(valid, benchmark - b_center, 0.0)
+
+    n = window_sums(valid.astype(np.float64), window)
+    sx, sb = window_sums(x, window), window_sums(b, window)
+    sxx, sbb, sxb = window_sums(x * x, window), window_sums(b * b, window), window_sums(x * b, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = sxb - sx * sb / n
+        var_x = np.maximum(sxx - sx * sx / n, 0.0)
+        var_b = np.maximum(sbb - sb * sb / n, 0.0)
+        beta = np.where(var_b > 0, cov / var_b, np.nan)
+        correlation = np.where((var_x > 0) & (var_b > 0), cov / np.sqrt(var_x * var_b), np.nan)
+    enough = n >= max(min_periods, 2)
+    return np.where(enough, beta, np.nan), np.clip(np.where(enough, correlation, np.nan), -1.0, 1.0)
+
+
+class RollingMetrics:
+    """스냅샷 수익률에 대한 롤링 지표 계산기 (티커 묶음, 창 크기별 결과 캐시)
+
+    스냅샷과 함께 모든 세션이 공유하므로 같은 ETF/창을 본 세션이 있으면 다시 계산하지 않습니다.
+    """
+
+    def __init__(self, returns: pd.DataFrame, risk_free_rate: float = 0.0, annual_factor: int = 252,
+                 max_entries: int = 64):
+        self.returns = returns
+        self.risk_free_rate = risk_free_rate
+        self.annual_factor = annual_factor
+        self.max_entries = max_entries
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, tickers: list, window: int, benchmark: str = None, min_periods: int = None) -> dict:
+        """{ROLLING_METRICS 이름: (거래일 x 티커) DataFrame}
+
+        benchmark가 없거나 수익률에 없는 티커면 Beta/Correlation은 NaN입니다.
+        """
+        tickers = tuple(tk for tk in tickers if tk in self.returns.columns)
+        min_periods = min_periods or window
+        key = (tickers, window, benchmark, min_periods)
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        result = self._compute(list(tickers), window, benchmark, min_periods)
+        with self.lock:
+            self.cache[key] = result
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+        return result
+
+    def _compute(self, tickers: list, window: int, benchmark: str, min_periods: int) -> dict:
+        values = self.returns[tickers].to_numpy(dtype=np.float64)
+        _, mean, variance = rolling_moments(values, window, min_periods)
+        annual_return = mean * self.annual_factor
+        volatility = np.sqrt(variance * self.annual_factor)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            sharpe = np.where(volatility > 1e-6, (annual_return - self.risk_free_rate) / volatility, np.nan)
+
+        if benchmark is not None and benchmark in self.returns.columns:
+            benchmark_values = self.returns[benchmark].to_numpy(dtype=np.float64)
+            beta, correlation = rolling_beta_correlation(values, benchmark_values, window, min_periods)
+        else:
+            beta = correlation = np.full(values.shape, np.nan)
+
+        arrays = {
+            'Volatility': volatility,
+            'Sharpe': sharpe,
+            'Drawdown': rolling_drawdown(values, window),
+            'Beta': beta,
+            'Correlation': correlation
+        }
+        return {name: pd.DataFrame(arrays[name], index=self.returns.index, columns=tickers) for name in ROLLING_METRICS}
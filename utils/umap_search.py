@@ -0,0 +1,127 @@
+# UMAP 하이퍼파라미터 격자 탐색
+# (n_neighbors, min_dist) 조합을 프로세스 풀에서 나눠 평가하고 직렬 실행과 같은 순서 규칙으로 최적 임베딩 선택
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import umap.umap_ as umap
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+
+_executor = None
+_executor_workers = 0
+_executor_lock = threading.Lock()
+
+
+def _get_executor(n_workers: int) -> ProcessPoolExecutor:
+    """프로세스 풀 재사용 (UMAP/numba 초기화 비용을 첫 실행에만 냄)"""
+    global _executor, _executor_workers
+    with _executor_lock:
+        if _executor is None or _executor_workers != n_workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False, cancel_futures=True)
+            # Streamlit 서버 스레드와 섞이지 않도록 fork 대신 spawn 사용
+            _executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_workers = n_workers
+        return _executor
+
+
+def umap_grid(n_samples: int, n_neighbors_options=(5, 10, 15), min_dist_options=(0.0, 0.1, 0.2)) -> list:
+    """평가 순서대로 나열한 (n_neighbors, min_dist) 조합 (표본 수에 맞춰 n_neighbors 제한)"""
+    return [(min(n_neighbors, max(1, n_samples - 1)), min_dist)
+            for n_neighbors in n_neighbors_options for min_dist in min_dist_options]
+
+
+def sampled_silhouette(data: np.ndarray, labels: np.ndarray, sample_size: int = None, random_state: int = 42) -> float:
+    """실루엣 점수 (sample_size보다 많으면 무작위 표본으로 추정해 O(n^2) 거리 계산을 피함)"""
+    if sample_size is not None and len(data) > sample_size:
+        return float(silhouette_score(data, labels, sample_size=sample_size, random_state=random_state))
+    return float(silhouette_score(data, labels))
+
+
+def evaluate_umap_config(scaled_data: np.ndarray, n_neighbors: int, min_dist: float, random_state: int,
+                         knn: tuple = None, n_epochs: int = None, silhouette_sample: int = None):
+    """한 조합의 KMeans(k<=3) 실루엣 점수, UMAP 임베딩, 학습된 UMAP (실패하면 (-inf, None, None))
+
+    조합마다 같은 random_state로 시드를 고정하므로 어느 프로세스에서 실행해도 결과가 같습니다.
+    대규모 유니버스에서는 knn(미리 계산한 근사 최근접 이웃 (인덱스, 거리[, 검색 인덱스]))을 잘라 쓰고,
+    MiniBatchKMeans와 표본 실루엣으로 평가합니다. 검색 인덱스가 있어야 학습된 UMAP으로 새 점을 transform할 수 있습니다.
+    """
+    try:
+        n_components = min(3, scaled_data.shape[1])
+        if n_components == 0:
+            return -np.inf, None, None
+        options = {'n_epochs': n_epochs}
+        if knn is not None:
+            options['precomputed_knn'] = (knn[0][:, :n_neighbors], knn[1][:, :n_neighbors], *knn[2:])
+        reducer = umap.UMAP(
+            n_components=n_components,
+            n_neighbors=n_neighbors,
+            min_dist=min_dist,
+            random_state=random_state,
+            **options
+        )
+        umap_data = reducer.fit_transform(scaled_data)
+
+        temp_k = min(3, max(2, len(umap_data) - 1))
+        if temp_k < 2:
+            return -np.inf, None, None
+        if silhouette_sample is not None:
+            clusterer = MiniBatchKMeans(n_clusters=temp_k, n_init=3, batch_size=1024, random_state=random_state)
+        else:
+            clusterer = KMeans(n_clusters=temp_k, n_init='auto', random_state=random_state)
+        temp_labels = clusterer.fit_predict(umap_data)
+        if len(set(temp_labels)) < 2:
+            return -np.inf, None, None
+        return sampled_silhouette(umap_data, temp_labels, silhouette_sample, random_state), umap_data, reducer
+    except Exception:
+        return -np.inf, None, None
+
+
+def search_umap_grid(scaled_data: np.ndarray, grid: list, random_state: int = 42, n_workers: int = 1,
+                     early_stop_score: float = None, **options):
+    """격자에서 실루엣 점수가 가장 높은 UMAP 임베딩
+
+    결과는 격자 순서대로 확인합니다. early_stop_score 이상인 조합이 나오면 그 조합을 채택하고
+    나머지 평가는 취소합니다. 동점이면 먼저 나온 조합을 고르므로 n_workers와 관계없이 직렬 실행과 같습니다.
+    options(knn, n_epochs, silhouette_sample)는 evaluate_umap_config에 그대로 전달합니다.
+
+    Returns:
+        (최적 임베딩 또는 None, 최적 점수, 평가한 조합 수, 최적 (n_neighbors, min_dist) 또는 None,
+         최적 조합으로 학습된 UMAP 또는 None)
+    """
+    best_score, best_data, evaluated, best_config, best_reducer = -np.inf, None, 0, None, None
+    if not grid:
+        return best_data, best_score, evaluated, best_config, best_reducer
+
+    if n_workers > 1 and len(grid) > 1:
+        executor = _get_executor(n_workers)
+        futures = [executor.submit(evaluate_umap_config, scaled_data, n_neighbors, min_dist, random_state, **options)
+                   for n_neighbors, min_dist in grid]
+        results = (future.result() for future in futures)
+    else:
+        futures = []
+        results = (evaluate_umap_config(scaled_data, n_neighbors, min_dist, random_state, **options)
+                   for n_neighbors, min_dist in grid)
+
+    for config, (score, umap_data, reducer) in zip(grid, results):
+        evaluated += 1
+        if umap_data is not None and score > best_score:
+            best_score, best_data, best_config, best_reducer = score, umap_data, config, reducer
+        if early_stop_score is not None and best_score >= early_stop_score:
+            break
+
+    for future in futures:
+        future.cancel()
+    return best_data, best_score, evaluated, best_config, best_reducer
+
+
+def ann_graph(scaled_data: np.ndarray, n_neighbors: int, random_state: int = 42):
+    """NN-descent 근사 최근접 이웃 그래프 (인덱스, 거리, 검색 인덱스) - 격자 전체가 한 번 만든 그래프를 공유"""
+    return umap.nearest_neighbors(
+        scaled_data, n_neighbors, 'euclidean', {}, False, np.random.RandomState(random_state),
+        low_memory=True, use_pynndescent=True
+    )
+